@@ -0,0 +1,313 @@
+'''
+    @author [mst]
+    @file   assets.py
+    @brief  on-disk cache of the baked game sprites
+    every asset is decoded from png, scaled 2x, converted to the display
+    format and packed in the atlas at startup. all of that comes out the same
+    on every launch, so the finished pixels are saved in a single cache file
+    and the next launches only copy them back into surfaces. the pixels are
+    zlib compressed: the file is read whole at every launch (from network
+    drives on the kiosks), and the sprites are mostly flat colors. the bird
+    rotations are not cached, they are 8.7 MiB of pixels and rotate in ~13 ms
+
+    an entry is keyed by the sha1 of its source files, what was done to them and
+    the display pixel format, so editing a png or running on another display
+    just bakes that entry again. entries not used by a launch are dropped when
+    the file is rewritten
+
+    file format:
+        magic       4s  b'FLAC'
+        version     B
+        index size  I   little endian
+        index       utf-8 json {key: [[[width, height, flags, bitsize, masks, pitch, colorkey, offset, size], ...], meta]}
+                    key is the json of the entry key, meta is whatever else the
+                    entry needs (the rects of an atlas)
+        pixels      the zlib compressed surface buffers, at the offsets of the index
+
+    usage, after display.set_mode():
+        cache = AssetCache()
+        sprite_atlas = cache.atlas(sprite_assets)   # [(name, path, alpha, flip), ...]
+        ...
+        cache.save()    # only writes when something was baked. the file pixels are released
+
+    the files themselves are read and decoded by an AssetLoader, in worker
+    threads: reading is i/o bound and slow on network drives, and decoding
+    png/wav releases the gil. the display format conversions stay on the main
+    thread (SDL video calls are not thread safe). the browser build (pygbag)
+    cannot start threads, there everything is loaded in turn on the main thread:
+        loader = AssetLoader()
+        loader.prefetch(paths)          # start reading everything now
+        cache = AssetCache(loader=loader)
+        flap_sound = loader.sound('sound/sfx_wing.wav').result()
+
+    log:
+    -2023.03 atlas entries only
+    -2023.03 no worker threads in the browser
+    -2023.03 compressed pixels, json index, no bird rotations
+    -2023.03 files read and decoded in a thread pool
+    -2023.03 texture atlas entries
+    -2023.03 init
+'''
+
+import hashlib
+import io
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+import pygame           # main game lib
+from settings import *
+import atlas            # texture atlas
+
+MAGIC = b'FLAC'
+VERSION = 3
+HEADER = struct.Struct('<4sBI')
+ZLIB_LEVEL = 6  # the inflate speed is about the same at any level
+
+
+# the pixel format and the compressed pixels of a surface
+def pack_surface(surface, offset):
+    data = zlib.compress(surface.get_buffer().raw, ZLIB_LEVEL)
+    info = (surface.get_width(), surface.get_height(), surface.get_flags() & (pygame.SRCALPHA | pygame.RLEACCELOK),
+            surface.get_bitsize(), surface.get_masks(), surface.get_pitch(), surface.get_colorkey(), offset, len(data))
+    return info, data
+
+# a png asset, converted to the display format and scaled 2x. the loader
+# (if any) has it decoded already, only the conversion is left
+def load_image(path, alpha=False, flip=False, loader=None):
+    surface = loader.image(path) if loader else pygame.image.load(path)
+    surface = surface.convert_alpha() if alpha else surface.convert()
+    surface = pygame.transform.scale2x(surface)
+    return pygame.transform.flip(surface, False, True) if flip else surface
+
+# the exact copy of a surface from its raw pixels, already in its pixel format
+def unpack_surface(info, pixels):
+    width, height, flags, bitsize, masks, pitch, colorkey, offset, size = info
+    surface = pygame.Surface((width, height), flags & pygame.SRCALPHA, bitsize, masks)
+    if surface.get_pitch() != pitch:
+        return None     # padded differently by this build of SDL, bake it again
+    try:
+        surface.get_buffer().write(zlib.decompress(pixels[offset:offset + size]))
+    except (zlib.error, ValueError):
+        return None     # a broken file, bake it again
+    if colorkey is not None:    # some pngs come with a transparent color (the pipes)
+        surface.set_colorkey(tuple(colorkey), pygame.RLEACCEL if flags & pygame.RLEACCELOK else 0)
+    return surface
+
+
+class AssetLoader:
+    '''reads and decodes the asset files in a thread pool
+
+    every call returns at once with a Future (or waits for the result, for the
+    images). workers=0 loads everything on the spot, in the calling thread,
+    as does a platform without threads (emscripten)
+    '''
+
+    def __init__(self, workers=ASSET_WORKERS):
+        if sys.platform == 'emscripten':
+            workers = 0     # the browser build has no threads
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix='assets') if workers else None
+        self.files = {}     # path -> future of the file bytes
+        self.images = {}    # path -> future of the decoded, unconverted surface
+        self.times = {}     # path -> {'read': seconds, 'decode': seconds}, in the workers
+        self.start = time.perf_counter()
+        self.ready = {}     # path -> seconds since the loader start, when it was done
+
+    def _submit(self, function, *args):
+        if self.pool:
+            try:
+                return self.pool.submit(function, *args)
+            except RuntimeError:    # can't start new thread: load in turn from now on
+                self.pool.shutdown(wait=False)
+                self.pool = None
+        future = Future()
+        future.set_result(function(*args))
+        return future
+
+    def _timed(self, path, stage, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        now = time.perf_counter()
+        self.times.setdefault(path, {})[stage] = now - start
+        self.ready[path] = now - self.start
+        return result
+
+    def _read(self, path):
+        with open(path, 'rb') as file:
+            return file.read()
+
+    # start reading the files, in the order given
+    def prefetch(self, paths):
+        for path in paths:
+            self.read(path)
+
+    def read(self, path):
+        future = self.files.get(path)
+        if future is None:
+            future = self.files[path] = self._submit(self._timed, path, 'read', self._read, path)
+        return future
+
+    def data(self, path):
+        return self.read(path).result()
+
+    # start decoding the images, so they decode side by side
+    def prefetch_images(self, paths):
+        for path in paths:
+            self._image(path)
+
+    def _image(self, path):
+        future = self.images.get(path)
+        if future is None:
+            read = self.read(path)  # submitted first, so a worker is on it already
+            future = self.images[path] = self._submit(
+                lambda: self._timed(path, 'decode', pygame.image.load, io.BytesIO(read.result()), path))
+        return future
+
+    # the decoded image, not converted (the caller converts it on the main thread)
+    def image(self, path):
+        return self._image(path).result()
+
+    # a future of a decoded sound. the mixer must be initialized
+    def sound(self, path):
+        read = self.read(path)
+        return self._submit(lambda: self._timed(path, 'decode', pygame.mixer.Sound, io.BytesIO(read.result())))
+
+    # a font, from the bytes read by the pool (the font file object must live as long as the font)
+    def font(self, path, size):
+        return pygame.font.Font(io.BytesIO(self.data(path)), size)
+
+    def shutdown(self):
+        if self.pool:
+            self.pool.shutdown(wait=False)
+
+    # one line per file: read and decode times in the worker, and when it was ready
+    def report(self):
+        lines = []
+        for path, ready in sorted(self.ready.items(), key=lambda item: item[1]):
+            times = self.times[path]
+            stages = ', '.join(f'{stage} {seconds*1000:.2f} ms' for stage, seconds in times.items())
+            lines.append(f'  {path:<32}{stages:<34} ready at {ready*1000:.1f} ms')
+        return '\n'.join(lines)
+
+
+class AssetCache:
+    '''baked surfaces, loaded from a single file with a single read'''
+
+    def __init__(self, path=ASSET_CACHE, enabled=True, loader=None):
+        self.path = path
+        self.loader = loader    # an AssetLoader reads the sources, if given
+        self.enabled = enabled and bool(path)
+        self.index = {}     # json key -> (surface infos, meta), from the file
+        self.pixels = b''   # the pixels part of the file, until save()
+        self.size = 0       # the file size
+        self.used = {}      # key -> (surfaces, meta), the entries of this launch
+        self.hashes = {}    # source path -> sha1
+        self.hits = 0
+        self.misses = 0
+        self.load_time = 0
+        if self.enabled:
+            self._read()
+
+    def _read(self):
+        start = time.perf_counter()
+        try:
+            with open(self.path, 'rb') as file:
+                data = file.read()
+            self.size = len(data)
+            magic, version, index_size = HEADER.unpack_from(data)
+            if magic == MAGIC and version == VERSION:
+                self.index = json.loads(data[HEADER.size:HEADER.size + index_size])
+                self.pixels = memoryview(data)[HEADER.size + index_size:]
+        except (OSError, struct.error, ValueError):
+            self.index = {}     # no cache yet, or a broken one: bake everything
+        self.load_time = time.perf_counter() - start
+
+    def _hash(self, path):
+        digest = self.hashes.get(path)
+        if digest is None:
+            if self.loader:
+                data = self.loader.data(path)
+            else:
+                with open(path, 'rb') as file:
+                    data = file.read()
+            digest = self.hashes[path] = hashlib.sha1(data).hexdigest()
+        return digest
+
+    # sources: the files the surfaces are made from. recipe: anything that
+    # changes the result (the transform and its parameters, json types only)
+    def key(self, sources, recipe):
+        screen = pygame.display.get_surface()
+        display_format = (screen.get_bitsize(), screen.get_masks()) if screen else None
+        return json.dumps([[self._hash(path) for path in sources], recipe, display_format])
+
+    # the cached (surfaces, meta) of a key, or bake() them. bake returns a list of surfaces and the meta
+    def baked(self, sources, recipe, bake):
+        key = self.key(sources, recipe)
+        entry = self.used.get(key)
+        if entry is not None:
+            return entry
+        cached = self.index.get(key) if self.enabled else None
+        if cached is not None:
+            infos, meta = cached
+            surfaces = [unpack_surface(info, self.pixels) for info in infos]
+            if None not in surfaces:
+                entry = (surfaces, meta)
+        if entry is None:
+            self.misses += 1
+            entry = bake()
+        else:
+            self.hits += 1
+        self.used[key] = entry
+        return entry
+
+    # the sprites [(name, path, alpha, flip), ...] packed in a texture atlas
+    def atlas(self, sprites):
+        def bake():
+            if self.loader:
+                self.loader.prefetch_images(path for name, path, alpha, flip in sprites)
+            packed = atlas.build_atlas({name: load_image(path, alpha, flip, self.loader) for name, path, alpha, flip in sprites})
+            return packed.pages, packed.rects
+        recipe = ('atlas', tuple((name, alpha, flip) for name, path, alpha, flip in sprites))
+        pages, rects = self.baked([path for name, path, alpha, flip in sprites], recipe, bake)
+        return atlas.Atlas(pages, rects)
+
+    # rewrite the file when anything was baked. written aside and renamed, so
+    # an interrupted write never leaves half a cache. the launch is done with
+    # the file pixels by now, they are released either way
+    def save(self):
+        self.index = {}
+        self.pixels = b''
+        if not self.enabled or not self.misses:
+            return False
+        index = {}
+        chunks = []
+        offset = 0
+        for key, (surfaces, meta) in self.used.items():
+            infos = []
+            index[key] = (infos, meta)
+            for surface in surfaces:
+                info, raw = pack_surface(surface, offset)
+                infos.append(info)
+                chunks.append(raw)
+                offset += len(raw)
+        index_data = json.dumps(index).encode()
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path + '.tmp', 'wb') as file:
+                file.write(HEADER.pack(MAGIC, VERSION, len(index_data)))
+                file.write(index_data)
+                for raw in chunks:
+                    file.write(raw)
+            os.replace(self.path + '.tmp', self.path)
+        except OSError:
+            return False    # read-only (or browser) file system: bake on every launch
+        return True
+
+    def report(self):
+        return (f'asset cache: {self.hits} hits, {self.misses} baked, '
+                f'read in {self.load_time*1000:.1f} ms ({self.size/1024:.0f} KiB)')
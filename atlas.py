@@ -0,0 +1,130 @@
+'''
+    @author [mst]
+    @file   atlas.py
+    @brief  sprites packed in a texture atlas
+    every sprite is a rect of a few big surfaces (pages) instead of a surface
+    of its own, and is drawn with blit(page, dest, area). many sprites can go
+    in a single Surface.blits call, and the sprites are loaded and cached as
+    a couple of surfaces instead of one file each.
+
+    pygame picks the blending by the source surface (plain copy, colorkey or
+    per-pixel alpha), so the sprites are grouped in one page per blend mode:
+    an opaque page (background, floor) and an alpha page (bird, greeting).
+    each page draws exactly like the sprites in it. colorkey sprites (the
+    pipes) keep a page each: they are run-length encoded (RLEACCEL), and a
+    blit with an area walks the encoded rows of the page up to it, which
+    made the pipes 2-3x slower to draw from a shared page
+
+    usage:
+        atlas = build_atlas({'floor': floor_surface, 'bird0': ...})
+        atlas.blit(screen, 'floor', (0, FLOOR_HEIGHT))
+        atlas.blits(screen, [('pipe0', (x, y)), ('pipe0_upper', (x, y2))])
+
+    log:
+    -2023.03 init
+'''
+
+import math
+import pygame           # main game lib
+
+
+class Atlas:
+    '''the pages and the rect index of the packed sprites'''
+
+    def __init__(self, pages, rects):
+        self.pages = pages  # page surfaces
+        self.rects = rects  # name -> (page index, area rect)
+        self.areas = {name: (pages[page], pygame.Rect(rect)) for name, (page, rect) in rects.items()}
+
+    # (page, area) of a sprite, the source of a blit
+    def sprite(self, name):
+        return self.areas[name]
+
+    # like Surface.get_rect: the sprite size at (0,0), or placed by the keywords (center=...)
+    def get_rect(self, name, **kwargs):
+        rect = pygame.Rect((0, 0), self.areas[name][1].size)
+        for attribute, value in kwargs.items():
+            setattr(rect, attribute, value)
+        return rect
+
+    # a sprite as a surface of its own, sharing the page pixels
+    # (for the transforms, that do not take an area)
+    def subsurface(self, name):
+        page, area = self.areas[name]
+        return page.subsurface(area)
+
+    def blit(self, screen, name, dest):
+        page, area = self.areas[name]
+        return screen.blit(page, dest, area)
+
+    # draw (name, dest) pairs in a single call. returns the screen rects
+    def blits(self, screen, sprites):
+        areas = self.areas
+        return screen.blits([(areas[name][0], dest, areas[name][1]) for name, dest in sprites])
+
+    # pixel memory of the pages in bytes
+    def memory(self):
+        return sum(page.get_width() * page.get_height() * page.get_bytesize() for page in self.pages)
+
+    def report(self):
+        return (f'atlas: {len(self.rects)} sprites in {len(self.pages)} pages ' +
+                ', '.join(f'{page.get_width()}x{page.get_height()}' for page in self.pages) +
+                f', {self.memory()/1024:.0f} KiB')
+
+
+# shelf packing: the tallest sprites first, left to right in rows. good
+# enough for a handful of sprites. returns name -> (x, y, w, h) and the page size
+def pack(sizes):
+    widest = max(w for w, h in sizes.values())
+    width = max(widest, math.ceil(math.sqrt(sum(w * h for w, h in sizes.values()))))
+    width = min(width, sum(w for w, h in sizes.values()))   # no wider than a single row
+    rects = {}
+    x = y = shelf = 0
+    for name in sorted(sizes, key=lambda name: sizes[name][1], reverse=True):
+        w, h = sizes[name]
+        if x + w > width:
+            x = 0
+            y += shelf
+            shelf = 0
+        rects[name] = (x, y, w, h)
+        x += w
+        shelf = max(shelf, h)
+    return rects, (width, y + shelf)
+
+# how pygame blends a surface: per-pixel alpha, a colorkey or a plain copy
+def blend_mode(surface):
+    if surface.get_flags() & pygame.SRCALPHA:
+        return 'alpha', None
+    colorkey = surface.get_colorkey()
+    return ('colorkey', colorkey) if colorkey is not None else ('opaque', None)
+
+# pack the sprites {name: surface} into pages of the same pixel formats
+def build_atlas(sprites):
+    groups = {}
+    for name, surface in sprites.items():
+        groups.setdefault(blend_mode(surface), []).append(name)
+
+    pages = []
+    rects = {}
+    for (mode, colorkey), names in groups.items():
+        if mode == 'colorkey' and len(names) > 1:   # a page each (see above)
+            for name in names:
+                single = build_atlas({name: sprites[name]})
+                rects[name] = (len(pages), single.rects[name][1])
+                pages.append(single.pages[0])
+            continue
+        layout, size = pack({name: sprites[name].get_size() for name in names})
+        template = sprites[names[0]]
+        page = pygame.Surface(size, template.get_flags() & pygame.SRCALPHA, template)
+        if mode == 'alpha':
+            page.fill((0, 0, 0, 0))
+        elif mode == 'colorkey':
+            page.fill(colorkey)     # the key pixels are not blitted, they stay the key
+        for name in names:
+            # max over a cleared page is an exact copy, alpha included (a normal blit would blend)
+            page.blit(sprites[name], layout[name][:2], special_flags=pygame.BLEND_RGBA_MAX if mode == 'alpha' else 0)
+            rects[name] = (len(pages), layout[name])
+        if mode == 'colorkey':
+            page.set_colorkey(colorkey, pygame.RLEACCEL)
+        pages.append(page)
+    return Atlas(pages, rects)
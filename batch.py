@@ -0,0 +1,181 @@
+'''
+    @author [mst]
+    @file   batch.py
+    @brief  numpy batch simulator: many birds on one pipes course
+    a vectorized twin of engine.py for bot training. all the birds fly the same
+    course, each bird has its own y, speed, alive flag and score. the physics
+    constants and the frame order are the same as engine.step, so a bird here
+    follows exactly the path of a single engine game given the same flaps and
+    the same random pipes
+    this needs numpy. install with: pip install numpy
+
+    usage:
+        flock = BatchGame(10000)
+        flock.reset()
+        while flock.step(flaps):  # flaps: a bool array, one per bird
+            ...
+
+    log:
+    -2023.03 pipes from the engine spawn schedule
+    -2023.03 init
+'''
+
+import math
+import random           # pipe heights and textures, same stream as engine.py
+import numpy as np
+from settings import *
+import engine           # the pipes spawn schedule
+
+
+# the most pipes that can be on the course at once: they spawn every
+# PIPE_SPACING pixels and are dropped once they leave the display
+PIPE_CAPACITY = math.ceil((PIPE_START_X + PIPE_WIDTH) / PIPE_SPACING) + 1
+
+# the bird never leaves its column, so its horizontal hitbox bounds are constants
+BIRD_LEFT = BIRD_START_X - BIRD_WIDTH//2
+BIRD_RIGHT = BIRD_LEFT + BIRD_WIDTH
+
+
+class BatchGame:
+    '''N birds stepped together with numpy arrays'''
+
+    def __init__(self, n, rng=random):
+        self.n = n
+        self.rng = rng  # anything with choice() and randrange(), e.g. random.Random(seed)
+        self.schedule = engine.PipeSchedule(rng)    # the course, as a single engine game
+        self.bird_y = np.empty(n, dtype=np.float64)       # bird rect centery (whole numbers)
+        self.bird_speed = np.empty(n, dtype=np.float64)
+        self.alive = np.zeros(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int64)
+        # the pipes course, kept sorted by x (oldest first)
+        self.pipe_x = np.zeros(PIPE_CAPACITY, dtype=np.int64)
+        self.pipe_height = np.zeros(PIPE_CAPACITY, dtype=np.int64)
+        self.pipe_texture = np.zeros(PIPE_CAPACITY, dtype=np.int64)
+        self.pipe_count = 0
+        self.tick = 0
+        self.distance = 0
+        # scratch buffers, so a step does not allocate
+        self._tmp = np.empty(n, dtype=np.float64)
+        self._hit = np.empty(n, dtype=bool)
+        self._mask = np.empty(n, dtype=bool)
+
+    # launch all the birds (same as engine.reset_game for each of them)
+    def reset(self):
+        self.bird_y.fill(BIRD_START_Y)
+        self.bird_speed.fill(BIRD_START_SPEED)
+        self.alive.fill(True)
+        self.score.fill(0)
+        self.pipe_count = 0
+        self.tick = 0
+        self.distance = 0
+        self.schedule.reset()   # a new course, from the rng as it is now
+
+    def spawn_pipe(self, x, pipe_height, texture):
+        if self.pipe_count == PIPE_CAPACITY:  # can't happen with the default constants
+            self._drop_pipes(1)
+        self.pipe_x[self.pipe_count] = x
+        self.pipe_height[self.pipe_count] = pipe_height
+        self.pipe_texture[self.pipe_count] = texture
+        self.pipe_count += 1
+
+    def _drop_pipes(self, k):
+        count = self.pipe_count
+        for arr in (self.pipe_x, self.pipe_height, self.pipe_texture):
+            arr[:count-k] = arr[k:count]
+        self.pipe_count -= k
+
+    # the pipe pair overlapping the bird column, or -1.
+    # pipes are far apart, so there is at most one
+    def _pipe_at_bird(self):
+        for i in range(self.pipe_count):
+            left = self.pipe_x[i] - PIPE_WIDTH//2
+            if left >= BIRD_RIGHT:
+                break   # sorted by x, all the rest are further right
+            if left + PIPE_WIDTH > BIRD_LEFT:
+                return i
+        return -1
+
+    # advance all the birds by a frame. flaps is a bool array (or None)
+    # returns True while any bird is alive
+    def step(self, flaps=None):
+        alive = self.alive
+        tmp = self._tmp
+        hit = self._hit
+        mask = self._mask
+
+        self.tick += 1
+        self.distance += PIPE_SPEED
+        for pipe in self.schedule.due(self.distance):
+            self.spawn_pipe(*pipe)
+
+        if not alive.any():
+            return False
+
+        # flap: halt gravity effect and jump
+        if flaps is not None:
+            np.logical_and(flaps, alive, out=mask)
+            self.bird_speed[mask] = -BIRD_FLAP_POWER
+
+        # gravity, only the alive birds move
+        np.add(self.bird_speed, GRAVITY_COEFF, out=tmp)
+        np.copyto(self.bird_speed, tmp, where=alive)
+        np.add(self.bird_y, self.bird_speed, out=tmp)
+        # round half away from zero like a pygame rect (see engine.round_rect)
+        np.less(tmp, 0, out=mask)
+        np.abs(tmp, out=tmp)
+        tmp += 0.5
+        np.floor(tmp, out=tmp)
+        np.negative(tmp, out=tmp, where=mask)
+        np.copyto(self.bird_y, tmp, where=alive)
+
+        # display boundaries: top <= -tolerance or bottom >= floor
+        np.less_equal(self.bird_y, BIRD_HEIGHT//2 - BIRD_DISPLAY_TOLERANCE, out=hit)
+        np.greater_equal(self.bird_y, FLOOR_HEIGHT - BIRD_HEIGHT + BIRD_HEIGHT//2, out=mask)
+        hit |= mask
+
+        # pipes: a gap interval test against the single pipe in the bird column.
+        # the far ends of the pipes are out of the display bounds, so a bird
+        # within bounds hits a pipe exactly when it leaves the gap
+        i = self._pipe_at_bird()
+        if i >= 0:
+            gap_top = self.pipe_height[i] - PIPE_MARGIN
+            gap_bottom = self.pipe_height[i]
+            np.less(self.bird_y, gap_top + BIRD_HEIGHT//2, out=mask)         # bird top above the gap
+            hit |= mask
+            np.greater(self.bird_y, gap_bottom - BIRD_HEIGHT + BIRD_HEIGHT//2, out=mask)  # bird bottom below it
+            hit |= mask
+
+        self.score += alive   # the death frame still counts, same as engine.step
+        hit &= alive
+        alive &= ~hit
+
+        # move the pipes and drop those that left the display
+        count = self.pipe_count
+        self.pipe_x[:count] -= PIPE_SPEED
+        gone = 0
+        while gone < count and self.pipe_x[gone] + PIPE_WIDTH//2 < 0:
+            gone += 1
+        if gone:
+            self._drop_pipes(gone)
+        return True
+
+
+# [demo] measure the batch speed: python batch.py
+if __name__ == '__main__':
+    import time
+    n = 10000
+    flock = BatchGame(n, random.Random(0))
+    flock.reset()
+    flap_rng = np.random.default_rng(0)
+    flaps = np.zeros(n, dtype=bool)
+    ticks = 0
+    elapsed = 0
+    while ticks < 2000:
+        if not flock.alive.any():
+            flock.reset()
+        flaps[:] = flap_rng.random(n) < 0.05
+        start = time.perf_counter()
+        flock.step(flaps)
+        elapsed += time.perf_counter() - start
+        ticks += 1
+    print(f'{n} birds, {ticks} ticks: {elapsed/ticks*1000:.3f} ms per tick')
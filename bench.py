@@ -0,0 +1,172 @@
+'''
+    @author [mst]
+    @file   bench.py
+    @brief  headless benchmark of the game hot paths
+    runs the real game (main.py) on the dummy video and audio drivers for a fixed
+    number of frames with scripted input (a simple autopilot pressing space),
+    without the frame cap. reports frames/sec and per-function timings and
+    saves them as json, so runs on different commits can be compared
+
+    usage:
+        python bench.py --frames 5000 --out bench.json
+        python bench.py --full-redraw       # without dirty rects rendering
+        python bench.py --startup 5         # launch to first frame, without and with the asset cache
+
+    log:
+    -2023.03 init
+'''
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')   # no window
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')   # no sound device
+
+import argparse
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+import pygame           # main game lib
+
+import main             # sets up the game without running it
+import engine
+import bots
+from settings import *
+
+# the functions to time, as (module, name)
+TIMED = [(main, 'rotate_bird'), (main, 'draw_pipes'), (engine, 'check_collisions'),
+         (main, 'draw_score'), (main, 'draw_floor')]
+RESTART_DELAY = 60  # frames on the game over screen before pressing space again
+
+
+class Timings:
+    '''wraps module functions to sum up their call times'''
+
+    def __init__(self, functions):
+        self.calls = {}
+        self.total = {}
+        for module, name in functions:
+            self._wrap(module, name)
+
+    def _wrap(self, module, name):
+        function = getattr(module, name)
+        self.calls[name] = 0
+        self.total[name] = 0
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            self.total[name] += time.perf_counter() - start
+            self.calls[name] += 1
+            return result
+        setattr(module, name, timed)
+
+    def report(self):
+        return {name: {'calls': self.calls[name],
+                       'total_ms': self.total[name] * 1000,
+                       'mean_us': self.total[name] / self.calls[name] * 1e6 if self.calls[name] else 0}
+                for name in self.calls}
+
+
+# press space when the bird sinks below the next gap, or to restart a game a bit later
+def autopilot(halted_frames):
+    if not main.game.active:
+        return halted_frames >= RESTART_DELAY
+    return bots.autopilot(main.game)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+def run(frames, seed=0, full_redraw=False):
+    random.seed(seed)   # the game seeds
+    main.save_scores = False     # benchmark games stay off the leaderboard
+    main.renderer.enabled = not full_redraw
+    timings = Timings(TIMED)
+    frame_times = []
+    halted_frames = 0
+    games = 0
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        frame_start = time.perf_counter()
+        if autopilot(halted_frames):
+            games += not main.game.active
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+        halted_frames = 0 if main.game.active else halted_frames + 1
+        main.handle_events()
+        main.render(main.update(1 / FPS))   # one physics step a frame, as fast as it goes
+        frame_times.append(time.perf_counter() - frame_start)
+    elapsed = time.perf_counter() - start
+
+    frame_times.sort()
+    return {
+        'commit': git_commit(),
+        'frames': frames,
+        'seed': seed,
+        'dirty_rendering': not full_redraw,
+        'pixel_collisions': main.game.hitbox is not None,
+        'games': games,
+        'fps': frames / elapsed,
+        'frame_ms': {f'p{p}': frame_times[min(frames - 1, frames * p // 100)] * 1000 for p in (50, 95, 99)},
+        'functions': timings.report(),
+    }
+
+# start the game in a new process until its first display update, ms from the
+# launch (as seen from here) and from the top of main.py (as seen by the game)
+def launch():
+    start = time.perf_counter()
+    game = subprocess.Popen([sys.executable, 'main.py', '--frames', '1', '--startup'],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    for line in game.stdout:
+        if line.startswith('startup:'):
+            launched = (time.perf_counter() - start) * 1000
+            game.wait()
+            return launched, float(line.split()[1])
+    game.wait()
+    raise RuntimeError('the game quit before its first frame')
+
+# the first launch bakes the asset cache, the next ones read it
+def startup(runs):
+    if os.path.exists(ASSET_CACHE):
+        os.remove(ASSET_CACHE)
+    cold = launch()
+    warm = [launch() for _ in range(runs)]
+    return {
+        'commit': git_commit(),
+        'runs': runs,
+        'cold_ms': {'process': cold[0], 'main': cold[1]},
+        'warm_ms': {'process': statistics.median(t[0] for t in warm), 'main': statistics.median(t[1] for t in warm)},
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='headless benchmark of the game hot paths')
+    parser.add_argument('--frames', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--full-redraw', action='store_true', help='disable the dirty rects rendering')
+    parser.add_argument('--startup', type=int, metavar='N', help='time N launches to the first frame instead')
+    parser.add_argument('--out', default='bench.json', help='json results file')
+    args = parser.parse_args()
+
+    if args.startup:
+        results = startup(args.startup)
+        with open(args.out, 'w') as file:
+            json.dump(results, file, indent=2)
+        for run, times in (('cold', results['cold_ms']), ('warm', results['warm_ms'])):
+            print(f'{run} start: {times["process"]:.1f} ms from launch, {times["main"]:.1f} ms from main.py')
+        print(f'saved to {args.out}')
+        sys.exit()
+
+    results = run(args.frames, args.seed, args.full_redraw)
+    with open(args.out, 'w') as file:
+        json.dump(results, file, indent=2)
+
+    print(f'{results["frames"]} frames, {results["games"]} games: {results["fps"]:.0f} fps '
+          f'(p50 {results["frame_ms"]["p50"]:.3f} ms, p99 {results["frame_ms"]["p99"]:.3f} ms)')
+    for name, timing in results['functions'].items():
+        print(f'  {name:<18}{timing["calls"]:>8} calls {timing["mean_us"]:>9.1f} us')
+    print(f'saved to {args.out}')
@@ -0,0 +1,35 @@
+'''
+    @author [mst]
+    @file   bots.py
+    @brief  simple scripted players
+    a bot is a function of the game state that returns True to flap.
+    no pygame here, bots work with the headless engine as well as the window
+
+    log:
+    -2023.03 batch autopilot
+    -2023.03 init
+'''
+
+from settings import *
+
+
+# flap when the bird sinks below the gap of the next pipe. restarts a halted game
+def autopilot(state, margin=60):
+    if not state.active:
+        return True
+    gap_bottom = FLOOR_HEIGHT - 200     # no pipe ahead: keep above the floor
+    for pipe in state.pipes:
+        if pipe.x + PIPE_WIDTH//2 > BIRD_START_X - BIRD_WIDTH//2:   # not passed yet
+            gap_bottom = pipe.height
+            break
+    return state.bird_speed > 0 and state.bird_y > gap_bottom - margin
+
+# the same for all the birds of a batch.BatchGame, returns a bool array. margin
+# can be an array too, one per bird, so the birds of a flock fly different paths
+def autopilot_batch(batch, margin=60):
+    gap_bottom = FLOOR_HEIGHT - 200
+    for i in range(batch.pipe_count):
+        if batch.pipe_x[i] + PIPE_WIDTH//2 > BIRD_START_X - BIRD_WIDTH//2:
+            gap_bottom = batch.pipe_height[i]
+            break
+    return (batch.bird_speed > 0) & (batch.bird_y > gap_bottom - margin)
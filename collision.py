@@ -0,0 +1,63 @@
+'''
+    @author [mst]
+    @file   collision.py
+    @brief  pixel accurate bird hitbox
+    the engine hitbox is the unrotated bird rect, which is unfair: a tilted bird
+    looks nothing like it. this hitbox is the drawn (rotated) sprite instead.
+    the engine still does the cheap part (picking the pipes in the bird column
+    and the gap test, see engine.check_collisions), the masks are only
+    compared on near misses
+
+    usage:
+        game.hitbox = MaskHitbox(bird_rotations)
+        game.hitbox = load_hitbox()     # the same, without a display (replays, bots)
+
+    log:
+    -2023.03 the flap frame comes from the game state, headless loading
+    -2023.03 init
+'''
+
+import pygame           # main game lib
+from settings import *
+import sprites          # the rotated bird sprites
+
+
+class MaskHitbox:
+    '''the rotated bird sprite as a hitbox, with masks cached per flap frame and angle'''
+
+    def __init__(self, rotations):
+        self.rotations = rotations  # sprites.RotationCache, the same sprites the bird is drawn with
+        self.masks = {}             # rotation cache key -> mask
+        self.pipe_mask = pygame.Mask((PIPE_WIDTH, PIPE_LENGTH), fill=True)  # pipes are solid rects
+
+    def _sprite(self, state):
+        angle = -state.bird_speed * BIRD_ROTATION_COEFF  # the same angle main.rotate_bird draws
+        key = self.rotations.key(state.flap_frame, angle)
+        mask = self.masks.get(key)
+        if mask is None:
+            mask = self.masks[key] = pygame.mask.from_surface(self.rotations.get(state.flap_frame, angle))
+        return mask
+
+    # the drawn sprite bounds as (left, top, right, bottom). the rotated surface
+    # is blitted at the topleft of the unrotated bird rect (see main.draw_bird)
+    def bounds(self, state):
+        width, height = self._sprite(state).get_size()
+        left = BIRD_START_X - BIRD_WIDTH//2
+        top = state.bird_y - BIRD_HEIGHT//2
+        return left, top, left + width, top + height
+
+    # narrow phase: does the sprite touch either pipe of the pair
+    def hits(self, state, pipe):
+        mask = self._sprite(state)
+        left = BIRD_START_X - BIRD_WIDTH//2
+        top = state.bird_y - BIRD_HEIGHT//2
+        pipe_left = pipe.x - PIPE_WIDTH//2 - left
+        upper_top = pipe.height - PIPE_MARGIN - PIPE_LENGTH - top
+        return (mask.overlap(self.pipe_mask, (pipe_left, upper_top)) is not None or
+                mask.overlap(self.pipe_mask, (pipe_left, pipe.height - top)) is not None)
+
+# the hitbox without a display: the bird images are not converted to the display
+# format, the masks come out the same. lazy, only the angles that show up are rotated
+def load_hitbox(resolution=BIRD_ANGLE_RESOLUTION):
+    frames = [pygame.transform.scale2x(pygame.image.load(path)) for path in BIRD_ASSETS]
+    return MaskHitbox(sprites.RotationCache(frames, resolution, lazy=True, max_size=1024))
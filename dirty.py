@@ -0,0 +1,84 @@
+'''
+    @author [mst]
+    @file   dirty.py
+    @brief  dirty rectangles rendering
+    instead of repainting the background and pushing the whole framebuffer every
+    frame, we only restore the background under the sprites drawn last frame and
+    update the regions that changed. for machines (and browsers) where fill-rate
+    is the bottleneck
+
+    usage, once a frame:
+        renderer.begin()            # restore the background, or paint it all on a full frame
+        if renderer.full:
+            ...                     # static sprites, drawn on full frames only
+        renderer.add(screen.blit(...))  # sprites that move, every frame
+        renderer.add_covered(layer.draw(...))   # opaque layers redrawn every frame
+        renderer.end()              # display.update() on what changed
+
+    log:
+    -2023.03 full redraw when the window is exposed
+    -2023.03 opaque layers: no background under them
+    -2023.03 the background can be an atlas sprite
+    -2023.03 init
+'''
+
+import pygame           # main game lib
+
+
+class DirtyRenderer:
+    '''tracks the screen regions touched by moving sprites
+
+    with enabled=False every frame is a full redraw, the same as a plain
+    blit-the-background + display.update() loop. area: where the background
+    is in the background surface (an atlas page), None for all of it.
+    visible: the screen rect the background shows in, None for the whole
+    screen. the rest must be covered by opaque layers drawn every frame
+    '''
+
+    def __init__(self, screen, background, enabled=True, area=None, visible=None):
+        self.screen = screen
+        self.background = background
+        self.area = pygame.Rect(area) if area else background.get_rect()
+        self.visible = pygame.Rect(visible) if visible else screen.get_rect()
+        self.enabled = enabled
+        self.full = True        # the next frame repaints everything
+        self.rects = []         # drawn this frame
+        self.last_rects = []    # drawn last frame, to be restored
+        self.covered = []       # drawn this frame by opaque layers, only updated
+
+    # force a full redraw on the next frame, e.g. when the game state changes
+    # and the static sprites come and go, or the window is exposed or restored
+    def invalidate(self):
+        self.full = True
+
+    def begin(self):
+        self.full = self.full or not self.enabled
+        left, top = self.area.topleft
+        visible = self.visible
+        if self.full:
+            self.screen.blit(self.background, visible, visible.move(left, top))
+        else:
+            for rect in self.last_rects:
+                rect = rect.clip(visible)   # the layers paint over the rest
+                if rect:
+                    self.screen.blit(self.background, rect, rect.move(left, top))
+
+    def add(self, rect):
+        self.rects.append(rect)
+
+    def add_all(self, rects):
+        self.rects.extend(rects)
+
+    # a rect repainted whole by an opaque layer every frame: updated, never restored
+    def add_covered(self, rect):
+        self.covered.append(rect)
+
+    def end(self):
+        if self.full:
+            pygame.display.update()
+        else:
+            pygame.display.update(self.last_rects + self.rects + self.covered)
+        self.full = False
+        self.last_rects, self.rects = self.rects, self.last_rects
+        self.rects.clear()
+        self.covered.clear()
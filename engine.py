@@ -0,0 +1,292 @@
+'''
+    @author [mst]
+    @file   engine.py
+    @brief  headless game simulation core
+    the game mechanics (bird physics, pipes, collisions, score) with no pygame
+    dependency, so the game can be stepped in batch jobs, tests and bots without
+    a window or a frame cap. main.py renders a view over this state
+
+    usage:
+        game = GameState()
+        flap(game)                  # same as pressing space: starts the game
+        while step(game, action=...): # one step is one frame
+            ...
+
+    log:
+    -2023.03 pipes spawned by a distance schedule, drawn ahead
+    -2023.03 seeded games, the flap animation frame is part of the state
+    -2023.03 broad phase collisions, pluggable hitbox
+    -2023.03 pipes kept in a fixed size pool
+    -2023.03 split from main.py
+'''
+
+import random           # variable elements positioning and textures
+from collections import deque
+from settings import *
+
+
+# the bird is placed by a pygame rect in the renderer, and rect coordinates are
+# integers: a float assigned to a rect is rounded half away from zero.
+# we round the same way so headless runs match the rendered game frame by frame
+def round_rect(value):
+    if value < 0:
+        return -int(-value + 0.5)
+    return int(value + 0.5)
+
+
+class Pipe:
+    '''a pipe pair. both pipes share the x position, the gap is PIPE_MARGIN above height'''
+    __slots__ = ('x', 'height', 'texture')
+
+    def __init__(self, x, height, texture=0):
+        self.x = x              # horizontal center of the pair
+        self.height = height    # top of the bottom pipe
+        self.texture = texture  # index into PIPE_ASSETS
+
+    # rects as (left, top, width, height) tuples, the same geometry main.py used
+    # with get_rect(midtop=...) and get_rect(midbottom=...)
+    def bottom_rect(self):
+        return (self.x - PIPE_WIDTH//2, self.height, PIPE_WIDTH, PIPE_LENGTH)
+
+    def upper_rect(self):
+        return (self.x - PIPE_WIDTH//2, self.height - PIPE_MARGIN - PIPE_LENGTH, PIPE_WIDTH, PIPE_LENGTH)
+
+
+class PipePool:
+    '''a fixed size ring buffer of pipe pairs, oldest (leftmost) first.
+    pipes that scroll off the display are recycled, so the memory and the
+    per-frame cost stay the same however long a game runs
+    '''
+
+    def __init__(self, size=PIPE_POOL_SIZE):
+        self.slots = [Pipe(0, 0) for _ in range(size)]
+        self.start = 0  # slot of the oldest pipe
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        slots = self.slots
+        size = len(slots)
+        for i in range(self.start, self.start + self.count):
+            yield slots[i % size]
+
+    def clear(self):
+        self.start = 0
+        self.count = 0
+
+    # place a pipe at the right end. if the pool is full the oldest pipe is recycled
+    def spawn(self, x, height, texture):
+        size = len(self.slots)
+        if self.count == size:
+            self.start = (self.start + 1) % size
+            self.count -= 1
+        pipe = self.slots[(self.start + self.count) % size]
+        pipe.x = x
+        pipe.height = height
+        pipe.texture = texture
+        self.count += 1
+        return pipe
+
+    # drop the pipes that have left the display on the left
+    def cull(self):
+        slots = self.slots
+        while self.count and slots[self.start].x + PIPE_WIDTH//2 < 0:
+            self.start = (self.start + 1) % len(slots)
+            self.count -= 1
+
+
+class PipeSchedule:
+    '''the pipes of a course, placed by the distance scrolled instead of a timer
+
+    pipe k (from 1) spawns once the course has scrolled k * spacing pixels, at
+    PIPE_START_X less what it scrolled past that point: the pipes are exactly
+    spacing apart in world x even when spacing is not a whole number of frames.
+    the course is made of the ticks and the game rng only, so it is the same
+    in the window (any frame rate), headless and fast-forward games.
+    the height and texture of the next lookahead pipes are drawn ahead, at
+    reset and again as each pipe spawns, from the same rng stream in the same
+    order as drawing each one when it spawns
+    '''
+
+    def __init__(self, rng, spacing=PIPE_SPACING, lookahead=PIPE_LOOKAHEAD):
+        self.rng = rng  # anything with choice() and randrange()
+        self.spacing = spacing
+        self.lookahead = lookahead
+        self.pipes = deque()    # (distance, height, texture) of the pipes not spawned yet
+        self.drawn = 0          # pipes drawn from the rng so far
+
+    # a new course, from the current rng state
+    def reset(self):
+        self.pipes.clear()
+        self.drawn = 0
+        self._draw(self.lookahead)
+
+    def _draw(self, n):
+        rng = self.rng
+        while len(self.pipes) < n:
+            self.drawn += 1
+            height = rng.choice(PIPE_HEIGHTS)
+            texture = rng.randrange(len(PIPE_ASSETS))   # each pipe keeps its own texture
+            self.pipes.append((self.drawn * self.spacing, height, texture))
+
+    # the next n pipes to spawn as (distance, height, texture)
+    def upcoming(self, n=PIPE_LOOKAHEAD):
+        self._draw(n)
+        return [self.pipes[i] for i in range(n)]
+
+    # the scroll distance at which the next pipe spawns
+    def next_distance(self):
+        self._draw(1)
+        return self.pipes[0][0]
+
+    # the pipes reached at a scroll distance, as (x, height, texture)
+    def due(self, distance):
+        spawned = []
+        while self.next_distance() <= distance:
+            at, height, texture = self.pipes.popleft()
+            spawned.append((PIPE_START_X - round(distance - at), height, texture))
+        if spawned:
+            self._draw(self.lookahead)  # keep the window drawn ahead
+        return spawned
+
+
+class GameState:
+    '''the complete state of a single game'''
+
+    def __init__(self, hitbox=None, seed=None):
+        self.bird_y = round_rect(BIRD_START_Y)  # bird rect centery
+        self.bird_speed = BIRD_START_SPEED
+        self.pipes = PipePool()
+        self.score = 0
+        self.active = False     # indicate a un-halted game
+        self.death = None       # what ended the last game: 'bounds' or 'pipe'
+        self.tick = 0           # frames since the game started
+        # every game has its own random pipes, seeded at reset_game. a seed
+        # and the ticks of the flaps are enough to replay a game (see replay.py)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # the pipes come from the schedule as the course scrolls PIPE_SPEED a frame
+        self.schedule = PipeSchedule(self.rng)
+        self.distance = 0       # the course scroll: PIPE_SPEED a frame since the game started
+        # None for the bird rect hitbox. the renderer may plug in a pixel accurate
+        # one (collision.MaskHitbox), anything with bounds(state) and hits(state, pipe)
+        self.hitbox = hitbox
+
+    # the bird animation is part of the state so a pixel hitbox is reproducible
+    @property
+    def flap_frame(self):
+        return (self.tick // BIRD_FLAP_TICKS) % len(BIRD_ASSETS)
+
+    def bird_rect(self):
+        '''the bird hitbox as (left, top, width, height)'''
+        return (BIRD_START_X - BIRD_WIDTH//2, self.bird_y - BIRD_HEIGHT//2, BIRD_WIDTH, BIRD_HEIGHT)
+
+
+# the pipes the schedule has reached
+def spawn_pipes(state):
+    for x, height, texture in state.schedule.due(state.distance):
+        state.pipes.spawn(x, height, texture)
+
+def move_pipes(state):
+    for pipe in state.pipes:
+        pipe.x -= PIPE_SPEED
+    state.pipes.cull()
+
+# check birds-pipes collision for game over
+# returns what the bird hit ('bounds' or 'pipe'), None if nothing
+def check_collisions(state):
+    bird_top = state.bird_y - BIRD_HEIGHT//2
+    bird_bottom = bird_top + BIRD_HEIGHT
+    # check display boundaries
+    if bird_top <= -BIRD_DISPLAY_TOLERANCE or bird_bottom >= FLOOR_HEIGHT:
+        return 'bounds'
+
+    hitbox = state.hitbox
+    if hitbox is None:
+        left = BIRD_START_X - BIRD_WIDTH//2
+        top, right, bottom = bird_top, left + BIRD_WIDTH, bird_bottom
+    else:
+        left, top, right, bottom = hitbox.bounds(state)
+
+    # broad phase: the pipes are sorted by x, so we only look at the few in the bird column
+    for pipe in state.pipes:
+        pipe_left = pipe.x - PIPE_WIDTH//2
+        if pipe_left >= right:
+            break       # this one and the rest are still ahead
+        if pipe_left + PIPE_WIDTH <= left:
+            continue    # passed
+        # the pipes are one gap interval: the far ends are out of the display
+        # bounds, so the bird is clear unless it leaves the gap
+        if top >= pipe.height - PIPE_MARGIN and bottom <= pipe.height:
+            continue
+        # the bird rect outside the gap overlaps a pipe. a finer hitbox has the last word on near misses
+        if hitbox is None or hitbox.hits(state, pipe):
+            return 'pipe'
+    return None  #no collision detected
+
+# renewing the game. a new game gets a new random seed unless one is given
+def reset_game(state, seed=None):
+    if seed is None:
+        seed = random.getrandbits(32)
+    state.seed = seed
+    state.rng.seed(seed)
+    state.schedule.reset()  # the next pipes are drawn now, not during the game
+    state.tick = 0
+    state.distance = 0
+    state.bird_speed = BIRD_START_SPEED
+    state.score = 0
+    state.bird_y = round_rect(BIRD_START_Y)
+    state.pipes.clear()  # clear all the pipes at start of game
+    state.death = None
+    state.active = True  # re-launch the game
+
+# user input: flap in a running game, restart a halted one
+# returns True for an actual flap (the renderer plays a sound on it)
+def flap(state):
+    if state.active:
+        state.bird_speed = 0   # halt gravity effect upon a flap
+        state.bird_speed -= BIRD_FLAP_POWER
+        return True
+    reset_game(state)
+    return False
+
+# advance the game by a single frame. returns True while the game is running
+def step(state, action=False):
+    if action:
+        flap(state)
+
+    state.tick += 1
+    state.distance += PIPE_SPEED
+    spawn_pipes(state)
+
+    if not state.active:
+        return False
+
+    state.bird_speed += GRAVITY_COEFF    # move the bird, maintain falling acceleration
+    state.bird_y = round_rect(state.bird_y + state.bird_speed)
+
+    state.death = check_collisions(state)
+    if state.death:
+        state.active = False
+
+    move_pipes(state)
+    state.score += 1  # [wip] option: count score as pipes passed
+    return state.active
+
+
+# [demo] measure the headless speed: python engine.py
+if __name__ == '__main__':
+    import time
+    game = GameState()
+    steps = 0
+    start = time.perf_counter()
+    while steps < 100000:
+        if not game.active:
+            flap(game)
+        # a dumb policy: flap whenever the bird falls below the screen middle
+        step(game, game.bird_speed > 0 and game.bird_y > BIRD_START_Y)
+        steps += 1
+    elapsed = time.perf_counter() - start
+    print(f'{steps} steps in {elapsed:.3f}s: {steps/elapsed:.0f} steps/sec')
@@ -0,0 +1,248 @@
+'''
+    @author [mst]
+    @file   env.py
+    @brief  gym-style environments for reinforcement learning
+    the game as reset(seed) / step(action) with a compact observation, no window
+    and no frame cap. Env wraps a single engine.GameState, VectorEnv steps many
+    games at once with numpy (each on its own seeded course, same physics as
+    engine.step frame by frame, with the rect hitbox)
+    this needs numpy. install with: pip install numpy
+
+    observation, float32 (pixels, pixels per frame):
+        bird y, bird speed,
+        x distance to the next pipe, its gap center y,
+        x distance to the pipe after it, its gap center y
+        (a pipe is next until the bird has passed it. with no pipe yet,
+        the distance is from the pipes spawn point and the gap is centered)
+    action: 1 to flap, 0 not to
+    reward: the frames survived during the step (the score gained)
+    done:   the bird hit something
+
+    usage:
+        env = Env(frame_skip=4)
+        obs = env.reset(seed=1)
+        while True:
+            obs, reward, done, info = env.step(policy(obs))
+            if done:
+                break
+
+        envs = VectorEnv(1024, frame_skip=4)
+        obs = envs.reset(seed=1)                                # (1024, 6)
+        obs, rewards, dones, info = envs.step(actions)        # finished games restart by themselves
+
+    log:
+    -2023.03 pipes from the engine spawn schedule
+    -2023.03 init
+'''
+
+import random
+import numpy as np
+import engine           # headless game mechanics
+from settings import *
+
+OBS_SIZE = 6
+BIRD_LEFT = BIRD_START_X - BIRD_WIDTH//2
+NO_PIPE = (PIPE_START_X - BIRD_START_X, sum(PIPE_HEIGHTS) / len(PIPE_HEIGHTS) - PIPE_MARGIN/2)
+PIPE_CAPACITY = PIPE_POOL_SIZE
+
+
+class Env:
+    '''a single game
+
+    frame_skip: frames stepped per action (the action is the flap on the first one)
+    hitbox:     None for the rect hitbox, collision.load_hitbox() for pixel collisions
+    '''
+
+    def __init__(self, frame_skip=1, hitbox=None):
+        self.frame_skip = frame_skip
+        self.state = engine.GameState(hitbox=hitbox)
+
+    def reset(self, seed=None):
+        engine.reset_game(self.state, seed)
+        return self.observe()
+
+    def step(self, action):
+        state = self.state
+        if not state.active:
+            raise RuntimeError('the game is over, call reset()')
+        score = state.score
+        if action:
+            engine.flap(state)
+        for _ in range(self.frame_skip):
+            if not engine.step(state):
+                break
+        info = {'score': state.score, 'tick': state.tick, 'death': state.death}
+        return self.observe(), state.score - score, not state.active, info
+
+    def observe(self):
+        state = self.state
+        obs = [state.bird_y, state.bird_speed]
+        for pipe in state.pipes:
+            if pipe.x + PIPE_WIDTH//2 > BIRD_LEFT:     # not passed yet
+                obs += (pipe.x - BIRD_START_X, pipe.height - PIPE_MARGIN/2)
+                if len(obs) == OBS_SIZE:
+                    break
+        while len(obs) < OBS_SIZE:
+            obs += NO_PIPE
+        return np.array(obs, dtype=np.float32)
+
+
+class VectorEnv:
+    '''n games stepped together, each on its own course
+
+    a finished game restarts at once with a new seed: the observation returned
+    for it is the first of the new game, info['final_obs'] and info['scores']
+    hold how the old one ended
+    '''
+
+    def __init__(self, n, frame_skip=1):
+        self.n = n
+        self.frame_skip = frame_skip
+        self.bird_y = np.empty(n, dtype=np.float64)
+        self.bird_speed = np.empty(n, dtype=np.float64)
+        self.active = np.zeros(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.distance = np.zeros(n, dtype=np.int64)     # the course scroll, as GameState.distance
+        self.next_spawn = np.zeros(n, dtype=np.float64)  # the distance of the next pipe of each game
+        # the pipes of every game, oldest first, as in engine.PipePool
+        self.pipe_x = np.zeros((n, PIPE_CAPACITY), dtype=np.int64)
+        self.pipe_height = np.zeros((n, PIPE_CAPACITY), dtype=np.int64)
+        self.pipe_count = np.zeros(n, dtype=np.int64)
+        self.schedules = [engine.PipeSchedule(random.Random()) for _ in range(n)]  # the pipes of each game, as GameState.schedule
+        self.seeds = np.zeros(n, dtype=np.int64)
+        self.seed_rng = random.Random()     # seeds of the restarted games
+        self._columns = np.arange(PIPE_CAPACITY)
+
+    # start all the games. game i gets seed + i, or a random seed
+    def reset(self, seed=None):
+        self.seed_rng.seed(seed)
+        self._reset(np.arange(self.n), None if seed is None else [seed + i for i in range(self.n)])
+        return self.observe()
+
+    def _reset(self, games, seeds=None):
+        for k, i in enumerate(games.tolist()):
+            seed = seeds[k] if seeds is not None else self.seed_rng.getrandbits(32)
+            self.seeds[i] = seed
+            schedule = self.schedules[i]
+            schedule.rng.seed(seed)
+            schedule.reset()
+            self.next_spawn[i] = schedule.next_distance()
+        self.bird_y[games] = engine.round_rect(BIRD_START_Y)
+        self.bird_speed[games] = BIRD_START_SPEED
+        self.active[games] = True
+        self.score[games] = 0
+        self.distance[games] = 0
+        self.pipe_count[games] = 0
+
+    # actions: one per game, truthy to flap
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=bool)
+        score = self.score.copy()
+        self.bird_speed[actions] = -BIRD_FLAP_POWER     # every game is running at the step start
+        for _ in range(self.frame_skip):
+            self._frame()
+            if not self.active.any():
+                break
+        rewards = self.score - score
+        dones = ~self.active
+        info = {}
+        if dones.any():
+            games = np.flatnonzero(dones)
+            info['final_obs'] = self.observe()[games]
+            info['scores'] = self.score[games]
+            info['games'] = games
+            self._reset(games)
+        return self.observe(), rewards, dones, info
+
+    # one engine.step of every running game
+    def _frame(self):
+        active = self.active
+        self.distance[active] += PIPE_SPEED
+        for i in np.flatnonzero(self.distance >= self.next_spawn).tolist():
+            self._spawn(i)
+
+        self.bird_speed[active] += GRAVITY_COEFF
+        y = self.bird_y + self.bird_speed
+        y = np.where(y < 0, -np.floor(-y + 0.5), np.floor(y + 0.5))    # engine.round_rect
+        self.bird_y[active] = y[active]
+
+        # collisions, as engine.check_collisions with the rect hitbox
+        top = self.bird_y - BIRD_HEIGHT//2
+        bottom = top + BIRD_HEIGHT
+        hit = (top <= -BIRD_DISPLAY_TOLERANCE) | (bottom >= FLOOR_HEIGHT)
+        pipe_left = self.pipe_x - PIPE_WIDTH//2
+        in_column = ((self._columns < self.pipe_count[:, None]) &
+                     (pipe_left < BIRD_LEFT + BIRD_WIDTH) & (pipe_left + PIPE_WIDTH > BIRD_LEFT))
+        in_gap = (top[:, None] >= self.pipe_height - PIPE_MARGIN) & (bottom[:, None] <= self.pipe_height)
+        hit |= (in_column & ~in_gap).any(axis=1)
+        self.score += active    # the death frame counts, as in engine.step
+        hit &= active
+
+        # move the pipes of the games still running this frame and drop those off the display
+        self.pipe_x[active] -= PIPE_SPEED
+        gone = active & (self.pipe_count > 0) & (self.pipe_x[:, 0] + PIPE_WIDTH//2 < 0)
+        if gone.any():
+            self.pipe_x[gone, :-1] = self.pipe_x[gone, 1:]
+            self.pipe_height[gone, :-1] = self.pipe_height[gone, 1:]
+            self.pipe_count[gone] -= 1
+        active &= ~hit
+
+    # the pipes the schedule of game i has reached (the texture does not matter here)
+    def _spawn(self, i):
+        schedule = self.schedules[i]
+        for x, height, texture in schedule.due(self.distance[i]):
+            count = self.pipe_count[i]
+            if count == PIPE_CAPACITY:   # recycle the oldest, as engine.PipePool
+                self.pipe_x[i, :-1] = self.pipe_x[i, 1:]
+                self.pipe_height[i, :-1] = self.pipe_height[i, 1:]
+                count -= 1
+            self.pipe_x[i, count] = x
+            self.pipe_height[i, count] = height
+            self.pipe_count[i] = count + 1
+        self.next_spawn[i] = schedule.next_distance()
+
+    # (n, OBS_SIZE) observations, the same as Env.observe for each game
+    def observe(self):
+        obs = np.empty((self.n, OBS_SIZE), dtype=np.float32)
+        obs[:, 0] = self.bird_y
+        obs[:, 1] = self.bird_speed
+        # the pipes are sorted by x, the passed ones come first
+        passed = ((self.pipe_x + PIPE_WIDTH//2 <= BIRD_LEFT) & (self._columns < self.pipe_count[:, None])).sum(axis=1)
+        rows = np.arange(self.n)
+        for k in range(2):
+            column = passed + k
+            exists = column < self.pipe_count
+            column = np.minimum(column, PIPE_CAPACITY - 1)
+            obs[:, 2 + 2*k] = np.where(exists, self.pipe_x[rows, column] - BIRD_START_X, NO_PIPE[0])
+            obs[:, 3 + 2*k] = np.where(exists, self.pipe_height[rows, column] - PIPE_MARGIN/2, NO_PIPE[1])
+        return obs
+
+
+# [demo] measure the speed: python env.py
+if __name__ == '__main__':
+    import time
+    for n in (1, 64, 1024):
+        envs = VectorEnv(n, frame_skip=4)
+        obs = envs.reset(seed=0)
+        rng = np.random.default_rng(0)
+        steps = 0
+        start = time.perf_counter()
+        while steps < 200000 and time.perf_counter() - start < 2:
+            # flap when below the next gap, with a bit of noise
+            actions = (obs[:, 1] > 0) & (obs[:, 0] > obs[:, 3] + PIPE_MARGIN/2 - 60) | (rng.random(n) < 0.01)
+            obs, rewards, dones, info = envs.step(actions)
+            steps += n
+        elapsed = time.perf_counter() - start
+        print(f'{n:>5} games: {steps / elapsed:>12,.0f} steps/sec ({steps * envs.frame_skip / elapsed:,.0f} frames/sec)')
+
+    env = Env(frame_skip=4)
+    obs = env.reset(seed=0)
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < 2:
+        obs, reward, done, info = env.step(obs[1] > 0 and obs[0] > obs[3] + PIPE_MARGIN/2 - 60)
+        steps += 1
+        if done:
+            obs = env.reset()
+    elapsed = time.perf_counter() - start
+    print(f'Env: {steps / elapsed:,.0f} steps/sec')
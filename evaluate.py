@@ -0,0 +1,200 @@
+'''
+    @author [mst]
+    @file   evaluate.py
+    @brief  parallel evaluation of bot policies, for evolving them
+    a policy is a row of numbers (the weights of a linear flap rule on the
+    env.py observation), so a whole population is one numpy array. every
+    policy plays the same courses: a course is the pipes of a seed, and a
+    batch.BatchGame flies a whole chunk of the population on it at once.
+
+    the population is spread over a multiprocessing pool, one process per core.
+    the policies and the scores live in shared memory: the workers read their
+    rows and write their scores in place, so a task is only a (start, stop)
+    range and its answer the number of policies done. nothing else is pickled,
+    whatever the population size. the chunks are small enough to keep every
+    core busy to the end (good policies live longer, so chunks take unequal time)
+
+    this needs numpy. install with: pip install numpy
+
+    usage:
+        with Evaluator(population=256, seeds=range(8)) as evaluator:
+            fitness = evaluator.evaluate(params)    # params: (n, PARAMS_SIZE), fitness: (n,)
+
+        flap = linear_policy(params[best][None], env_obs[None])[0]    # play one in env.Env
+
+    log:
+    -2023.03 init
+'''
+
+import math
+import multiprocessing
+import os
+import random
+from multiprocessing import shared_memory
+import numpy as np
+from settings import *
+import batch            # numpy batch simulator
+import env              # the observation layout
+
+PARAMS_SIZE = env.OBS_SIZE + 1  # a weight per observation and a bias
+# the observation scaled to about -1..1, so the weights have similar sizes
+OBS_SCALE = np.array([1/FLOOR_HEIGHT, 1/BIRD_FLAP_POWER, 1/DISPLAY_WIDTH, 1/FLOOR_HEIGHT,
+                      1/DISPLAY_WIDTH, 1/FLOOR_HEIGHT], dtype=np.float64)
+MAX_TICKS = 6000    # an episode ends here, even if the bird is still flying (100 s of play)
+TASKS_PER_PROCESS = 4
+
+
+# flap when the weighted observation is above 0. params: (n, PARAMS_SIZE), obs: (n, OBS_SIZE)
+def linear_policy(params, obs):
+    return np.einsum('ij,ij->i', obs * OBS_SCALE, params[:, :-1]) + params[:, -1] > 0
+
+# the env.Env observation of every bird of a batch game. the pipes are the
+# same for all of them, only the first two columns differ
+def observe_batch(game, out=None):
+    obs = np.empty((game.n, env.OBS_SIZE)) if out is None else out
+    obs[:, 0] = game.bird_y
+    obs[:, 1] = game.bird_speed
+    ahead = [i for i in range(game.pipe_count) if game.pipe_x[i] + PIPE_WIDTH//2 > env.BIRD_LEFT][:2]
+    pipes = [(game.pipe_x[i] - BIRD_START_X, game.pipe_height[i] - PIPE_MARGIN/2) for i in ahead]
+    pipes += [env.NO_PIPE] * (2 - len(pipes))
+    obs[:, 2:] = np.array(pipes).ravel()
+    return obs
+
+# the scores of the policies on each course, (n, len(seeds)). all the policies
+# fly a course together, the course of engine.reset_game(state, seed)
+def play(params, seeds, max_ticks=MAX_TICKS, policy=linear_policy):
+    scores = np.zeros((len(params), len(seeds)), dtype=np.int64)
+    game = batch.BatchGame(len(params), random.Random())
+    obs = np.empty((len(params), env.OBS_SIZE))
+    for k, seed in enumerate(seeds):
+        game.rng.seed(seed)
+        game.reset()
+        while game.tick < max_ticks and game.step(policy(params, observe_batch(game, obs))):
+            pass
+        scores[:, k] = game.score
+    return scores
+
+
+# the shared arrays, as attached by a worker process
+_worker = {}
+
+def _attach(names, capacity, seeds, max_ticks, policy):
+    params_memory = shared_memory.SharedMemory(name=names[0])
+    scores_memory = shared_memory.SharedMemory(name=names[1])
+    _worker.update(
+        memory=(params_memory, scores_memory),  # kept open as long as the worker lives
+        params=np.ndarray((capacity, PARAMS_SIZE), dtype=np.float64, buffer=params_memory.buf),
+        scores=np.ndarray((capacity, len(seeds)), dtype=np.int64, buffer=scores_memory.buf),
+        seeds=seeds, max_ticks=max_ticks, policy=policy)
+
+def _evaluate_range(bounds):
+    start, stop = bounds
+    w = _worker
+    w['scores'][start:stop] = play(w['params'][start:stop], w['seeds'], w['max_ticks'], w['policy'])
+    return stop - start
+
+
+class Evaluator:
+    '''a process pool playing populations of policies
+
+    population: the most policies evaluated at once (the shared arrays size)
+    seeds:      the courses every policy plays, fitness is the mean score on them
+    processes:  the pool size, the number of cores by default. 0 plays in this process
+    policy:     a module level function (params, obs) -> flaps, so workers can import it
+    '''
+
+    def __init__(self, population, seeds=range(8), processes=None, max_ticks=MAX_TICKS, policy=linear_policy):
+        self.capacity = population
+        self.seeds = list(seeds)
+        self.processes = os.cpu_count() if processes is None else processes
+        self.max_ticks = max_ticks
+        self.policy = policy
+        self.memory = [shared_memory.SharedMemory(create=True, size=max(1, size)) for size in
+                       (population * PARAMS_SIZE * 8, population * len(self.seeds) * 8)]
+        self.params = np.ndarray((population, PARAMS_SIZE), dtype=np.float64, buffer=self.memory[0].buf)
+        self.scores = np.ndarray((population, len(self.seeds)), dtype=np.int64, buffer=self.memory[1].buf)
+        self.pool = None
+        if self.processes:
+            self.pool = multiprocessing.Pool(self.processes, _attach, (
+                [memory.name for memory in self.memory], population, self.seeds, max_ticks, policy))
+
+    # the fitness of each policy (n, PARAMS_SIZE) -> (n,), the mean score over the seeds.
+    # the scores per seed are in self.scores[:n] until the next call
+    def evaluate(self, params):
+        n = len(params)
+        if n > self.capacity:
+            raise ValueError(f'{n} policies, the evaluator holds {self.capacity}')
+        self.params[:n] = params
+        if self.pool is None:
+            self.scores[:n] = play(self.params[:n], self.seeds, self.max_ticks, self.policy)
+        else:
+            size = max(1, math.ceil(n / (self.processes * TASKS_PER_PROCESS)))
+            ranges = [(start, min(start + size, n)) for start in range(0, n, size)]
+            done = sum(self.pool.imap_unordered(_evaluate_range, ranges))
+            assert done == n
+        return self.scores[:n].mean(axis=1)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if self.memory:
+            del self.params, self.scores    # the views hold the buffers
+            for memory in self.memory:
+                memory.close()
+                memory.unlink()
+            self.memory = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# [demo] evolve a population: python evaluate.py --generations 20
+# --scaling to time a generation with 1, 2, 4... processes up to the core count
+if __name__ == '__main__':
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description='evolve linear flap policies')
+    parser.add_argument('--population', type=int, default=256)
+    parser.add_argument('--seeds', type=int, default=8, help='courses per policy')
+    parser.add_argument('--generations', type=int, default=20)
+    parser.add_argument('--processes', type=int, help='pool size, the number of cores by default')
+    parser.add_argument('--scaling', action='store_true', help='time the evaluation for each pool size')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    params = rng.normal(0, 1, (args.population, PARAMS_SIZE))
+
+    if args.scaling:
+        cores = os.cpu_count()
+        counts = sorted({min(2**k, cores) for k in range(cores.bit_length() + 1)})
+        base = None
+        for processes in counts:
+            with Evaluator(args.population, range(args.seeds), processes) as evaluator:
+                evaluator.evaluate(params[:processes])  # warm up the workers
+                start = time.perf_counter()
+                evaluator.evaluate(params)
+                elapsed = time.perf_counter() - start
+            base = base or elapsed
+            print(f'{processes:>3} processes: {elapsed*1000:8.1f} ms a generation, {base/elapsed:5.2f}x')
+    else:
+        elite = max(2, args.population // 8)
+        with Evaluator(args.population, range(args.seeds), args.processes) as evaluator:
+            for generation in range(args.generations):
+                start = time.perf_counter()
+                fitness = evaluator.evaluate(params)
+                elapsed = time.perf_counter() - start
+                order = np.argsort(fitness)[::-1]
+                print(f'generation {generation:>3}: best {fitness[order[0]]:7.1f}, '
+                      f'mean {fitness.mean():7.1f} ({elapsed*1000:.0f} ms)')
+                # the best stay as they are, the rest are their mutated copies
+                parents = params[order[:elite]]
+                children = parents[rng.integers(elite, size=args.population - elite)]
+                children += rng.normal(0, 0.2, children.shape)
+                params = np.concatenate([parents, children])
+        print('best policy:', np.array2string(params[0], precision=3))
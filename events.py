@@ -0,0 +1,93 @@
+'''
+    @author [mst]
+    @file   events.py
+    @brief  input events to game actions, through lookup tables
+    the game only listens to a few event types (quit, key presses, clicks and
+    taps), so those are the only ones let into the queue: pygame.event.set_allowed
+    drops the rest (mouse motion, window and finger events...) as SDL posts them,
+    before they cost anything. a touchscreen flooding motion events leaves the
+    queue as short as a keyboard does. that goes for the window events too: one
+    the game needs (an expose or a restore, to repaint the dirty rects frames)
+    must get a handler with on_event(), or it is dropped like the mouse motion.
+
+    the queued events go through a table keyed on the event type, and the key
+    presses through a second one keyed on the key. a binding maps keys to an
+    action name, the game registers a function per action, so keys can be
+    rebound at runtime without touching the game code
+
+    usage:
+        dispatcher = EventDispatcher(KEY_BINDINGS)     # {'flap': ['space'], ...}
+        dispatcher.on_action('flap', action)
+        dispatcher.on_event(pygame.MOUSEBUTTONDOWN, lambda event: action())
+        dispatcher.on_event(pygame.WINDOWEXPOSED, lambda event: renderer.invalidate())  # let in, and handled
+        dispatcher.install()    # only the handled event types are queued from now on
+        dispatcher.dispatch()   # every frame
+        dispatcher.rebind('flap', ['up', 'w'])
+
+    log:
+    -2023.03 window events are handled the same way
+    -2023.03 init
+'''
+
+import pygame           # main game lib
+from settings import *
+
+
+class EventDispatcher:
+    '''dispatch tables: event type -> handler, key -> action -> function'''
+
+    def __init__(self, bindings=KEY_BINDINGS):
+        self.handlers = {pygame.KEYDOWN: self._key_down}    # event type -> function(event)
+        self.actions = {}       # action name -> function()
+        self.keys = {}          # key code -> action name
+        self.bindings = {}      # action name -> [key names], as given
+        for action, keys in bindings.items():
+            self.rebind(action, keys)
+
+    def on_event(self, event_type, handler):
+        self.handlers[event_type] = handler
+        self.install()
+
+    def on_action(self, action, function):
+        self.actions[action] = function
+
+    # set the keys of an action (pygame key names: 'space', 'f3', 'a'...), replacing its old ones.
+    # a key bound to another action is taken from it
+    def rebind(self, action, keys):
+        codes = [pygame.key.key_code(key) for key in keys]  # a ValueError for an unknown name, before changing anything
+        self.keys = {code: bound for code, bound in self.keys.items() if bound != action}
+        for code in codes:
+            self.keys[code] = action
+        for other, names in self.bindings.items():
+            if other != action:
+                self.bindings[other] = [name for name in names if pygame.key.key_code(name) not in codes]
+        self.bindings[action] = list(keys)
+
+    # the key names bound to an action
+    def keys_of(self, action):
+        return self.bindings.get(action, [])
+
+    # let only the handled event types into the queue (quit always), window events
+    # included. the filter is global to pygame, so it is set again whenever a handler is added
+    def install(self):
+        if not pygame.display.get_init():
+            return      # the event types are filtered once the display is up
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.QUIT] + list(self.handlers))
+
+    # handle the queued events. returns the number of events
+    def dispatch(self):
+        handlers = self.handlers
+        events = pygame.event.get()
+        for event in events:
+            handler = handlers.get(event.type)
+            if handler:
+                handler(event)
+        return len(events)
+
+    def _key_down(self, event):
+        action = self.keys.get(event.key)
+        if action:
+            function = self.actions.get(action)
+            if function:
+                function()
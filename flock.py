@@ -0,0 +1,157 @@
+'''
+    @author [mst]
+    @file   flock.py
+    @brief  draws a whole population of birds at once
+    for watching bots learn: hundreds of birds from a batch.BatchGame on the
+    same course. picking the rotated sprite of every bird is done with numpy
+    on the whole population, and all the birds go to the screen in a single
+    Surface.blits call. dead birds can stay on screen, dimmed, where they fell.
+
+    the birds all fly in the same column and many of them follow the same path
+    (500 autopilots make ~85 different sprite+position pairs a frame), so birds
+    exactly on top of each other are drawn once. the only difference is on the
+    half transparent edges, that a stack of blits would darken
+
+    this needs numpy. install with: pip install numpy
+
+    usage:
+        flock_renderer = FlockRenderer(bird_rotations)
+        rects = flock_renderer.draw(screen, batch.bird_y, batch.bird_speed, batch.alive, frame)
+
+    log:
+    -2023.03 init
+'''
+
+import numpy as np
+import pygame           # main game lib
+from settings import *
+
+BIRD_LEFT = BIRD_START_X - BIRD_WIDTH//2    # every bird flies in the same column
+TOP_RANGE = 4096    # bird tops are packed with the sprite index in a single int key, -2048..2047
+
+
+class FlockRenderer:
+    '''many birds in one blits call, from the rotated sprites table
+
+    rotations:  sprites.RotationCache, the same sprites as the single bird
+    dead_alpha: opacity of the dead birds 0-255, None to hide them
+    '''
+
+    def __init__(self, rotations, dead_alpha=FLOCK_DEAD_ALPHA):
+        self.rotations = rotations
+        self.dead_alpha = dead_alpha
+        # a flat table of the rotated sprites, index: frame * steps + angle step - step_min
+        self.steps = rotations.step_max - rotations.step_min + 1
+        self.table = [rotations.get(frame, step * rotations.resolution)
+                      for frame in range(len(rotations.frames))
+                      for step in range(rotations.step_min, rotations.step_max + 1)]
+        self.dimmed = {}    # table index -> dimmed sprite, made on first use
+        self.max_width = max(surface.get_width() for surface in self.table)
+        self.max_height = max(surface.get_height() for surface in self.table)
+
+    # the table indices of birds, the same pick as RotationCache.key for each of them
+    def indices(self, bird_speed, frame):
+        steps = np.rint(-bird_speed * BIRD_ROTATION_COEFF / self.rotations.resolution)   # half to even, as round()
+        np.clip(steps, self.rotations.step_min, self.rotations.step_max, out=steps)
+        return (steps - self.rotations.step_min).astype(np.int64) + frame * self.steps
+
+    # the distinct (sprite index, top) pairs of the birds, as two lists
+    def _unique(self, indices, tops):
+        keys = np.unique(indices * TOP_RANGE + (tops + TOP_RANGE//2))
+        return (keys // TOP_RANGE).tolist(), (keys % TOP_RANGE - TOP_RANGE//2).tolist()
+
+    def _dimmed(self, index):
+        surface = self.dimmed.get(index)
+        if surface is None:
+            surface = self.dimmed[index] = self.table[index].copy()
+            surface.fill((255, 255, 255, self.dead_alpha), special_flags=pygame.BLEND_RGBA_MULT)
+        return surface
+
+    # draw the birds: bird_y (rect centery), bird_speed and alive are arrays of the same size,
+    # frame the flap animation frame. returns the screen rects touched (a single bounding rect)
+    def draw(self, screen, bird_y, bird_speed, alive, frame=0):
+        indices = self.indices(bird_speed, frame)
+        tops = (bird_y - BIRD_HEIGHT//2).astype(np.int64)
+        blits = []
+        if self.dead_alpha:     # below the birds still flying
+            dimmed = self._dimmed
+            blits += [(dimmed(index), (BIRD_LEFT, top)) for index, top in zip(*self._unique(indices[~alive], tops[~alive]))]
+            shown = tops
+        else:
+            shown = tops[alive]
+        table = self.table
+        blits += [(table[index], (BIRD_LEFT, top)) for index, top in zip(*self._unique(indices[alive], tops[alive]))]
+        if not blits:
+            return []
+        screen.blits(blits, doreturn=False)
+        top = int(shown.min())
+        bounds = pygame.Rect(BIRD_LEFT, top, self.max_width, int(shown.max()) - top + self.max_height)
+        return [bounds.clip(screen.get_rect())]
+
+    # the same picture the slow way: a rotation lookup and a blit per bird, stacked birds too (for comparison)
+    def draw_each(self, screen, bird_y, bird_speed, alive, frame=0):
+        rects = []
+        for y, speed, flying in zip(bird_y.tolist(), bird_speed.tolist(), alive.tolist()):
+            if not flying and not self.dead_alpha:
+                continue
+            key = self.rotations.key(frame, -speed * BIRD_ROTATION_COEFF)
+            index = frame * self.steps + key[1] - self.rotations.step_min
+            surface = self.table[index] if flying else self._dimmed(index)
+            rects.append(screen.blit(surface, (BIRD_LEFT, int(y) - BIRD_HEIGHT//2)))
+        return rects
+
+
+# [demo] a flock of autopilots with different margins: python flock.py --birds 500
+# --frames N --uncapped for a benchmark, --each for the one blit a bird way
+if __name__ == '__main__':
+    import argparse
+    import random
+    import time
+    parser = argparse.ArgumentParser(description='a flock of bots on one course')
+    parser.add_argument('--birds', type=int, default=500)
+    parser.add_argument('--frames', type=int, help='quit after N frames')
+    parser.add_argument('--uncapped', action='store_true', help='no frame cap')
+    parser.add_argument('--each', action='store_true', help='draw the birds one blit each')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import main             # the window and the sprites, without running the game
+    import batch
+    import bots
+
+    screen = main.screen
+    flock = batch.BatchGame(args.birds, random.Random(args.seed))
+    flock.reset()
+    margins = np.random.default_rng(args.seed).uniform(10, 150, args.birds)
+    flock_renderer = FlockRenderer(main.bird_rotations)
+    draw = flock_renderer.draw_each if args.each else flock_renderer.draw
+
+    frame = 0
+    draw_time = 0
+    start = time.perf_counter()
+    while args.frames is None or frame < args.frames:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                args.frames = frame
+        if not flock.step(bots.autopilot_batch(flock, margins)):
+            flock.reset()
+
+        screen.blit(main.bg_page, (0,0), main.bg_area)
+        pipes = []
+        for i in range(flock.pipe_count):
+            upper, bottom = main.pipe_textures[flock.pipe_texture[i]]
+            left = int(flock.pipe_x[i]) - PIPE_WIDTH//2
+            height = int(flock.pipe_height[i])
+            pipes += [(upper, (left, height - PIPE_MARGIN - PIPE_LENGTH)), (bottom, (left, height))]
+        main.sprite_atlas.blits(screen, pipes)
+        draw_start = time.perf_counter()
+        draw(screen, flock.bird_y, flock.bird_speed, flock.alive, (flock.tick // BIRD_FLAP_TICKS) % 3)
+        draw_time += time.perf_counter() - draw_start
+        main.sprite_atlas.blit(screen, 'floor', (0, FLOOR_HEIGHT))
+        pygame.display.update()
+        main.clock.tick(0 if args.uncapped else FPS)
+        frame += 1
+
+    elapsed = time.perf_counter() - start
+    print(f'{args.birds} birds, {frame} frames: {frame / elapsed:.0f} fps, '
+          f'birds drawn in {draw_time / max(frame, 1) * 1000:.2f} ms a frame')
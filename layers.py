@@ -0,0 +1,93 @@
+'''
+    @author [mst]
+    @file   layers.py
+    @brief  pre-composited scrolling layers
+    the floor scrolls by whole pixels and repeats every display width, so it is
+    composed once into a strip twice the display width (two floors side by side,
+    as they were drawn every frame) and a frame of it is a single blit of a
+    display wide area of the strip: no overlapping second blit, and only the
+    rows on display are copied.
+
+    a blit from a source x that is not 16 bytes aligned is about 2x slower
+    (SDL copies the rows with SIMD), so the strip is kept in a band per
+    phase: band k is the strip shifted left by k pixels, and an offset is read
+    from its band at an aligned x (4 bands of 32-bit pixels)
+
+    the layer is opaque and covers its whole rect every frame, so the dirty
+    renderer does not need the background under it: the background only shows
+    in the rect above it (see dirty.DirtyRenderer visible), the full frames
+    paint that part and the dirty frames restore nothing under the floor
+
+    usage:
+        floor_layer = ScrollLayer(floor_surface, FLOOR_HEIGHT)
+        renderer.add_covered(floor_layer.draw(screen, floor_x))
+
+    log:
+    -2023.03 init
+'''
+
+import pygame           # main game lib
+from settings import *
+
+ALIGN_BYTES = 16    # the row copies are fastest from addresses aligned to this
+
+
+class ScrollLayer:
+    '''a tile repeated every display width, scrolled horizontally
+
+    tile: the surface (or (page, area) of an atlas), top: its y on the display.
+    only the rows from top to the display bottom are kept
+    '''
+
+    def __init__(self, tile, top, width=DISPLAY_WIDTH, height=DISPLAY_HEIGHT):
+        page, area = tile if isinstance(tile, tuple) else (tile, tile.get_rect())
+        area = pygame.Rect(area)
+        self.top = top
+        self.width = width
+        self.rows = min(area.height, height - top)
+        self.align = max(1, ALIGN_BYTES // page.get_bytesize())    # pixels
+        self.strip = pygame.Surface((2 * width, self.rows * self.align), 0, page)
+        for k in range(self.align):
+            # each tile over the end of the one before, as the floors were drawn on display
+            for x in range(-k, 2 * width, width):
+                self.strip.blit(page, (x, k * self.rows), (area.x, area.y, area.width, self.rows))
+        self.rect = pygame.Rect(0, top, width, self.rows)
+
+    # draw the layer scrolled by x (the tile starts at x, any whole number). returns the screen rect
+    def draw(self, screen, x):
+        offset = -x % self.width
+        phase = offset % self.align
+        return screen.blit(self.strip, self.rect, (offset - phase, phase * self.rows, self.width, self.rows))
+
+
+# [demo] the floor drawn the old way and from the layer: python layers.py
+if __name__ == '__main__':
+    import os
+    import time
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    screen = pygame.display.set_mode((DISPLAY_WIDTH, DISPLAY_HEIGHT))
+    floor = pygame.transform.scale2x(pygame.image.load('assets/base.png').convert())
+    background = pygame.transform.scale2x(pygame.image.load('assets/background-day.png').convert())
+    floor_layer = ScrollLayer(floor, FLOOR_HEIGHT)
+    sky = pygame.Rect(0, 0, DISPLAY_WIDTH, FLOOR_HEIGHT)
+    frames = 20000
+
+    def timed(name, draw):
+        start = time.perf_counter()
+        for frame in range(frames):
+            draw(-(frame % DISPLAY_WIDTH))
+        print(f'{name:<44}{(time.perf_counter() - start) / frames * 1e6:7.2f} us')
+
+    timed('floor, two blits', lambda x: screen.blits([(floor, (x, FLOOR_HEIGHT)), (floor, (x + DISPLAY_WIDTH, FLOOR_HEIGHT))]))
+    timed('floor, one area blit of the layer', lambda x: floor_layer.draw(screen, x))
+    timed('full frame background, whole display', lambda x: screen.blit(background, (0, 0)))
+    timed('full frame background, above the floor only', lambda x: screen.blit(background, sky, sky))
+
+    # the same pixels either way
+    for x in range(0, -DISPLAY_WIDTH, -7):
+        screen.blits([(floor, (x, FLOOR_HEIGHT)), (floor, (x + DISPLAY_WIDTH, FLOOR_HEIGHT))])
+        old = pygame.image.tostring(screen.subsurface(floor_layer.rect), 'RGB')
+        floor_layer.draw(screen, x)
+        assert pygame.image.tostring(screen.subsurface(floor_layer.rect), 'RGB') == old, x
+    print('same pixels')
@@ -0,0 +1,241 @@
+'''
+    @author [mst]
+    @file   leaderboard.py
+    @brief  persistent high scores in sqlite
+    every finished game is a row of a runs table. an index on the score keeps
+    an insert at O(log n) and reads the top k straight off the index. the rank
+    of a score comes from a second table counting the runs per score value,
+    kept up to date by a trigger in the same transaction as the insert: the
+    scores are frames survived, so there are a few thousand distinct values
+    even with millions of runs, and a rank sums those instead of the runs.
+
+    saving goes to a writer thread with its own connection, the game only puts
+    the score on a queue: the disk is never waited on during a frame. the
+    writes are sqlite transactions (wal journal, synchronous full), so a crash
+    or a power cut loses the last runs at worst, never the file. without
+    threads (the browser build) or when the writer can't open the file, the
+    runs are written at once by the game connection, a game over is the only
+    frame that waits for it
+
+    each machine keeps its own file. merge() adds the runs of another one,
+    a run is known by its machine and its time, so merging twice adds nothing
+
+    usage:
+        board = Leaderboard('leaderboard.db')
+        high_score = board.best()
+        board.submit(score, seed)       # returns at once
+        board.top(10)                   # [(score, seed, machine, played), ...]
+        board.rank(score)               # 1 for the best score
+        board.close()                   # waits for the pending writes
+
+    log:
+    -2023.03 written in turn where there are no threads
+    -2023.03 init
+'''
+
+import queue
+import socket
+import sys
+import threading
+import time
+try:
+    import sqlite3
+except ImportError:     # some builds (the browser one) come without it
+    sqlite3 = None
+from settings import *
+
+SCHEMA = '''
+    create table if not exists runs (
+        id      integer primary key,
+        score   integer not null,
+        seed    integer,
+        machine text not null,
+        played  real not null,      -- unix time
+        unique (machine, played));
+    create index if not exists runs_by_score on runs (score desc, id);
+    create table if not exists score_counts (
+        score   integer primary key,
+        runs    integer not null);
+    create trigger if not exists count_score after insert on runs begin
+        insert into score_counts values (new.score, 1)
+            on conflict (score) do update set runs = runs + 1;
+    end;
+'''
+INSERT = 'insert or ignore into runs (score, seed, machine, played) values (?, ?, ?, ?)'
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=10)
+    connection.execute('pragma journal_mode = wal')     # readers don't wait for the writer
+    connection.execute('pragma synchronous = full')
+    return connection
+
+
+class Leaderboard:
+    '''the runs of a sqlite file, written by a background thread
+
+    path:       the database file, None (or no sqlite3) keeps the scores of this session only
+    threaded:   write from a thread, by default wherever threads can start (not emscripten)
+    '''
+
+    def __init__(self, path=LEADERBOARD, threaded=None):
+        self.path = path if sqlite3 else None
+        self.machine = socket.gethostname()
+        self.session = []   # (score, seed), when there is no file
+        self.writes = queue.Queue()
+        self.writer = None
+        self.writer_failed = False  # the writer could not open the file and quit
+        self.connection = None
+        if self.path:
+            try:
+                self.connection = connect(self.path)
+                with self.connection:
+                    self.connection.executescript(SCHEMA)
+            except sqlite3.Error:
+                self.path = self.connection = None  # read-only (or browser) file system
+        if threaded is None:
+            threaded = sys.platform != 'emscripten'
+        if self.path and threaded:
+            self.writer = threading.Thread(target=self._write, name='leaderboard', daemon=True)
+            try:
+                self.writer.start()
+            except RuntimeError:    # can't start new thread: written in turn
+                self.writer = None
+
+    # the writer thread: every run queued so far goes in one transaction
+    def _write(self):
+        try:
+            connection = connect(self.path)
+        except sqlite3.Error:
+            # the game connection writes the runs from now on. the ones queued
+            # already are lost, and marked done so flush() does not wait for them
+            self.writer_failed = True
+            while True:
+                try:
+                    self.writes.get_nowait()
+                except queue.Empty:
+                    return
+                self.writes.task_done()
+        running = True
+        while running:
+            runs = [self.writes.get()]
+            while not self.writes.empty():
+                runs.append(self.writes.get())
+            if None in runs:    # close()
+                running = False
+                runs = [run for run in runs if run is not None]
+            try:
+                with connection:
+                    connection.executemany(INSERT, runs)
+            except sqlite3.Error:
+                pass    # a full disk or a locked file: the runs are lost, the game goes on
+            for _ in range(len(runs) + (not running)):
+                self.writes.task_done()
+        connection.close()
+
+    # save a finished game. never blocks, unless there is no writer thread
+    def submit(self, score, seed=None, played=None):
+        run = (score, seed, self.machine, time.time() if played is None else played)
+        if self.writer and not self.writer_failed:
+            self.writes.put(run)
+        elif self.connection:
+            try:
+                with self.connection:
+                    self.connection.execute(INSERT, run)
+            except sqlite3.Error:
+                pass    # as in the writer thread: the run is lost, the game goes on
+        else:
+            self.session.append((score, seed))
+
+    # the highest score, 0 with no runs yet. the queued runs may not be counted
+    def best(self):
+        if not self.connection:
+            return max((score for score, seed in self.session), default=0)
+        row = self.connection.execute('select max(score) from runs').fetchone()
+        return row[0] or 0
+
+    # the k best runs as (score, seed, machine, played), the earlier first on equal scores
+    def top(self, k=10):
+        if not self.connection:
+            return [(score, seed, self.machine, None) for score, seed in sorted(self.session, key=lambda run: -run[0])[:k]]
+        return self.connection.execute(
+            'select score, seed, machine, played from runs order by score desc, id limit ?', (k,)).fetchall()
+
+    # the place a score would take on the board: 1 + the runs with a higher score
+    def rank(self, score):
+        if not self.connection:
+            return 1 + sum(other > score for other, seed in self.session)
+        row = self.connection.execute('select sum(runs) from score_counts where score > ?', (score,)).fetchone()
+        return 1 + (row[0] or 0)
+
+    def count(self):
+        if not self.connection:
+            return len(self.session)
+        return self.connection.execute('select coalesce(sum(runs), 0) from score_counts').fetchone()[0]
+
+    # add the runs of another leaderboard file (from another machine). returns the runs added
+    def merge(self, path):
+        if not self.connection:
+            return 0
+        self.flush()
+        self.connection.execute('attach database ? as other', (path,))
+        try:
+            with self.connection:
+                return self.connection.execute(
+                    'insert or ignore into runs (score, seed, machine, played) '
+                    'select score, seed, machine, played from other.runs order by id').rowcount
+        finally:
+            self.connection.execute('detach database other')
+
+    # wait until the writer is done with the queued runs
+    def flush(self):
+        if self.writer and not self.writer_failed:
+            self.writes.join()
+
+    def close(self):
+        if self.writer:
+            self.writes.put(None)
+            self.writer.join()
+            self.writer = None
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+
+# [demo] fill a board and time it: python leaderboard.py --runs 1000000 --path /tmp/board.db
+# or print the best runs of a file: python leaderboard.py --path leaderboard.db
+if __name__ == '__main__':
+    import argparse
+    import random
+    parser = argparse.ArgumentParser(description='high scores')
+    parser.add_argument('--path', default=LEADERBOARD)
+    parser.add_argument('--runs', type=int, default=0, help='add N random runs first')
+    parser.add_argument('--merge', metavar='FILE', help='add the runs of another file')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    board = Leaderboard(args.path)
+    if args.merge:
+        print(f'{board.merge(args.merge)} runs merged')
+    if args.runs:
+        rng = random.Random(0)
+        start = time.perf_counter()
+        now = time.time()
+        for i in range(args.runs):
+            board.submit(int(rng.expovariate(1 / 300)), rng.getrandbits(32), now + i * 1e-3)
+        queued = time.perf_counter() - start
+        board.flush()
+        print(f'{args.runs} runs: queued in {queued*1000:.0f} ms ({queued / args.runs * 1e6:.2f} us each), '
+              f'written in {time.perf_counter() - start:.1f} s')
+
+    start = time.perf_counter()
+    best = board.top(args.top)
+    top_time = time.perf_counter() - start
+    start = time.perf_counter()
+    ranks = [board.rank(score) for score in (0, 100, 1000)]
+    rank_time = (time.perf_counter() - start) / 3
+    print(f'{board.count()} runs, top {args.top} in {top_time*1000:.2f} ms, '
+          f'a rank in {rank_time*1000:.2f} ms (0: {ranks[0]}, 100: {ranks[1]}, 1000: {ranks[2]})')
+    for place, (score, seed, machine, played) in enumerate(best, 1):
+        print(f'{place:>3}. {score:>6}  {machine}  {time.strftime("%Y-%m-%d %H:%M", time.localtime(played)) if played else ""}')
+    board.close()
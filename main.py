@@ -8,6 +8,14 @@
     this uses pygame. install with: pip install pygame
 
     log:
+    -2023.03 the floor is a pre-composited scrolling layer
+    -2023.03 adaptive frame pacing with real sleeps, quality presets
+    -2023.03 events dispatched from tables, only the handled types are queued
+    -2023.03 high scores saved in a leaderboard file
+    -2023.03 assets loaded by worker threads behind a splash screen
+    -2023.03 sprites from a texture atlas
+    -2023.03 baked sprites cache, startup time
+    -2023.03 game mechanics moved to a headless engine (engine.py), this is the renderer
     -2022.02.25 asynced and packed with pygbag
                 -issues running in browser: FAILED
                 attempted to run with a pyinstaller exe: FAILED
@@ -21,158 +29,134 @@
     @version 0.1 2023.02
 '''
 
+import time             # startup time
+START_TIME = time.perf_counter()    # as early as it gets (the interpreter start is not counted)
+
 import asyncio          # packaging async
 import pygame           # main game lib
 from sys import exit    # system utils (exit)
-import random           # variable elements positioning and textures
-
-
-# constants
-# [bp] use caps for const values
-DISPLAY_WIDTH  = 576
-DISPLAY_HEIGHT = 1024
-FPS = 120   # frames per second
-FONT_SIZE = 50
-FONT_ANTIALIAS = False
-SOUND_FREQ = 44100
-SOUND_SIZE = -16
-SOUND_CHANNELS = 2
-SOUND_BUFFER = 512
-COLOR_RGB = [255, 255, 255]
-SCORE_X = DISPLAY_WIDTH/2
-SCORE_Y = 100
-HIGHSCORE_Y = 850
-
-FLOOR_HEIGHT = 900
-FLOOR_SPEED = 1
-GRAVITY_COEFF = 0.25    # gravity acceleration
-BIRD_START_X = 100
-BIRD_START_Y = DISPLAY_HEIGHT/2
-BIRD_START_SPEED = -10
-BIRD_ROTATION_COEFF = 3 # bird surface rotation sensitivity
-BIRD_FLAP_POWER = 7     # how strong is the bird's flap. decrease to make game easier :)
-BIRD_FLAP_FREQ = 300    #flapping animation speed
-BIRD_DISPLAY_TOLERANCE = 100
-PIPE_START_X = DISPLAY_WIDTH + 200
-PIPE_HEIGHTS = [400, 600, 800]  # possible pipes heights variations
-PIPE_MARGIN = 300   # the clearance between the pipes
-PIPE_SPEED = 5
-PIPE_FREQ = 1200    # pipes spawning frequency (in ms)
-
-SPAWNPIPE_EVT = pygame.USEREVENT    # custom event to spawn a pipe
-BIRD_FLAP_EVT = pygame.USEREVENT+1  # custom event to spawn a pipe
+
+from settings import *  # game constants
+import engine           # headless game mechanics. this module renders a view over it
+import text             # glyph-cached score text
+import dirty            # dirty rects rendering
+import collision        # pixel accurate bird hitbox
+import timestep         # fixed timestep physics
+import replay           # game recording
+import profiler         # frame stages timing
+import bots             # scripted players
+import assets           # baked sprites cache
+import sprites          # bird rotations
+import leaderboard      # saved high scores
+import events           # input dispatch tables
+import pacing           # frame pacing, quality presets
+import layers           # scrolling floor layer
 
 ############
 # game mechanics related variables
+# the game itself (bird, pipes, score) lives in the engine state
 #
-gravity = GRAVITY_COEFF
-bird_speed = BIRD_START_SPEED
-game_active = False # indicate a un-halted game
-game_score = 0
-high_score = 0  # [wip] load from a saved value
-
-# to make a continuous floor, we make two floor surfaces move alternately
+# pipes and the bird animation go by the game ticks, not by timers, so every game can be replayed
+game = engine.GameState()
+# every finished game is saved, the best one ever is the high score (see leaderboard.py)
+# the saving is done by a thread, a game over never waits for the disk
+scores = leaderboard.Leaderboard(LEADERBOARD)
+high_score = scores.best()
+save_scores = True  # the games played by bots are not saved, nor these (bench.py)
+recorder = replay.Recorder() if RECORD_REPLAYS else None
+
+# the physics runs in fixed steps, the frames are drawn in between two steps
+# (see timestep.py). the draw functions interpolate by render_alpha from the previous step
+render_alpha = 1.0
+prev_bird_y = game.bird_y
+
+# to make a continuous floor, two floors side by side are composed once in a strip (see layers.py),
+# a frame of it is a single area blit at the floor offset
+# the draw functions return the screen rects they touched (for the dirty rects rendering)
+# without floor scrolling (a low quality level) the floor stays put and is only drawn on full frames
 def draw_floor():
-    screen.blit(floor_surface, (floor_x,FLOOR_HEIGHT))
-    screen.blit(floor_surface, (floor_x+DISPLAY_WIDTH,FLOOR_HEIGHT))
+    if not frame_pacer.quality.floor_scroll:
+        return [floor_layer.draw(screen, 0)] if renderer.full else []
+    x = floor_x + round(FLOOR_SPEED * (1 - render_alpha))
+    return [floor_layer.draw(screen, x)]
 
 # different bird animation surfaces are loaded as a list
-# and are changed via a user timer event
+# and are changed every BIRD_FLAP_TICKS game steps (see engine.GameState.flap_frame)
 def bird_animation():
     global bird_flap_index
-    bird_flap_index = (bird_flap_index + 1) % 3 # arbitrate flapping animation surfaces
-    new_bird_surface = bird_flaps[bird_flap_index]
-    new_bird_rect = new_bird_surface.get_rect(center = (BIRD_START_X, bird_rect.centery))  # this will draw a rectangle around the bird surface
-    return new_bird_surface, new_bird_rect
+    bird_flap_index = game.flap_frame # arbitrate flapping animation surfaces
+    return bird_flaps[bird_flap_index]
 
-# surfaces rotation will lower its quality so we rotate and create a new surface each time
-# [wip] make a lambda function for this
-def rotate_bird(bird_surface):
-    global bird_speed
-
-    rotation_angle = -bird_speed * BIRD_ROTATION_COEFF # we will let the bird speed determine the rotation angle
-    new_surface = pygame.transform.rotozoom(bird_surface,rotation_angle,1)
-    return new_surface
+# surfaces rotation will lower its quality so we always rotate the original flap surface.
+# the rotations are rendered once at startup, here we only pick one
+# (at any quality level: with PIXEL_COLLISIONS the rotated sprite is also the hitbox)
+def rotate_bird():
+    rotation_angle = -game.bird_speed * BIRD_ROTATION_COEFF # we will let the bird speed determine the rotation angle
+    return bird_rotations.get(bird_flap_index, rotation_angle)
 
 def draw_bird(bird_rotated):
-    screen.blit(bird_rotated, bird_rect)
-
+    bird_rect.center = (BIRD_START_X, timestep.lerp(prev_bird_y, game.bird_y, render_alpha))  # follow the simulated bird
+    return screen.blit(bird_rotated, bird_rect)
+
+# each pipe draws with its own texture. the flipped upper pipe sprite is made at load time.
+# all the pipes go to the screen in a single blits call
+def draw_pipes(pipes):
+    blits = []
+    shift = round(PIPE_SPEED * (1 - render_alpha))  # back to where the pipes are between the steps
+    for pipe in pipes:
+        upper, bottom = pipe_textures[pipe.texture]
+        left = pipe.x - PIPE_WIDTH//2 + shift
+        blits.append((upper, (left, pipe.height - PIPE_MARGIN - PIPE_LENGTH)))
+        blits.append((bottom, (left, pipe.height)))
+    return sprite_atlas.blits(screen, blits)
+
+# collisions are checked by the engine. we only make the noise
+def play_collision_sound():
+    if game.death == 'bounds':
+        die_sound.play()
+    else:
+        collision_sound.play()
 
-def move_pipes(pipe_rect_list_a):
-    for pipe_rect in pipe_rect_list_a:
-        pipe_rect.centerx -= PIPE_SPEED
-    return pipe_rect_list_a
+# a single fixed physics step of the game and the floor
+def simulate():
+    global prev_bird_y
+    global floor_x
 
-def draw_pipes(pipe_rect_list_a):
-    global pipe_surface # [wip] parametrize this correctly
-    for pipe_rect in pipe_rect_list_a:
-        if pipe_rect.top < 0:   # flip the upper pipe texture, spot it by rect boundary
-            pipe_surface_l = pygame.transform.flip(pipe_surface, False, True)
-        else:
-            pipe_surface_l = pipe_surface
-        screen.blit(pipe_surface_l, pipe_rect)
-
-def create_pipe():
-    global pipe_surface
-    pipe_height = random.choice(PIPE_HEIGHTS)
-    pipe_surface = random.choice(pipe_surfaces) # [wip] this changes all pipes texture, make individual
-    bottom_pipe = pipe_surface.get_rect(midtop = (PIPE_START_X, pipe_height)) # place by midtop
-    upper_pipe = pipe_surface.get_rect(midbottom = (PIPE_START_X, pipe_height - PIPE_MARGIN)) # place at midbottom
-    return bottom_pipe, upper_pipe  # the two pipes are returned as a tuple
-
-# check birds-pipes collision for game over
-def check_collisions(pipe_rect_list_a):
-    # check display boundaries
-    if bird_rect.top <= -BIRD_DISPLAY_TOLERANCE or bird_rect.bottom >= FLOOR_HEIGHT:
-        die_sound.play()
-        return False
-
-    for pipe in pipe_rect_list_a:
-        # use rectangles for collision control.
-        # [bp][wip] costly. dont overuse. consider using a simple pipes heights bounds logic
-        if bird_rect.colliderect(pipe):
-            collision_sound.play()
-            return False
-    return True  #no collision detected
-
-# render score as text and draw as a surface
-# [wip] single score printing function, parametrized by game state
+    prev_bird_y = game.bird_y
+    was_active = game.active
+    engine.step(game)
+    if was_active and not game.active:
+        play_collision_sound()
+        if recorder:
+            recorder.finish(game)
+        if save_scores and not controller:
+            scores.submit(game.score, game.seed)
+
+    # the floor will be moving regardless the game state
+    floor_x -= FLOOR_SPEED
+    # reset moving floor
+    if (floor_x <= -DISPLAY_WIDTH):
+        floor_x = 0
+
+# draw the scores from cached digit glyphs (see text.py)
 def draw_score():
-    score_surface = game_font.render(str(game_score), FONT_ANTIALIAS, COLOR_RGB)
-    score_rect = score_surface.get_rect(center = (SCORE_X, SCORE_Y))
-    screen.blit(score_surface, score_rect)  # [demo] origin of the surfaces is the top left
+    return score_text.draw(screen, game.score)
 
 def draw_highscore():
-    highscore_surface = game_font.render(f'High Score: {int(high_score)}', FONT_ANTIALIAS, COLOR_RGB)    # [demo] use f-string to compose a title
-    highscore_rect = highscore_surface.get_rect(center = (SCORE_X, HIGHSCORE_Y))
-    screen.blit(highscore_surface, highscore_rect)  # [demo] origin of the surfaces is the top left
-
-# renewing the game
-def reset_game():
-    global bird_speed    # reset bird movement
-    bird_speed = BIRD_START_SPEED
-
-    global game_score   # reset the running score
-    game_score = 0
-
-    bird_rect.center = (BIRD_START_X, BIRD_START_Y)
-    pipe_rect_list.clear()  # clear all the pipes at start of game
-
-    global game_active
-    game_active = True  # re-launch the game
+    return highscore_text.draw(screen, high_score)
 
 def update_highscore():
-    global game_score
     global high_score
-    if (game_score > high_score):
-        high_score = game_score
+    if (game.score > high_score):
+        high_score = game.score
 
 # user exits game functionality:
 def exit_app():
+    frame_profiler.dump()   # only if anything was timed
+    scores.close()  # the last score may still be on its way to the file
     pygame.quit()
     exit()  # terminating the game engine is not enough. we must also quit the app itself
 
-
 ############
 # pygame related variables
 
@@ -190,9 +174,40 @@ screen = pygame.display.set_mode((DISPLAY_WIDTH, DISPLAY_HEIGHT))
 # set a clock for frame rate control
 clock = pygame.time.Clock()
 
+# the asset files are read and decoded by worker threads while this goes on (see assets.py),
+# the main thread only converts them. the greeting comes first, it is the splash screen
+sprite_assets = [   # (name, file, alpha, flipped) of every sprite
+    ('background', 'assets/background-day.png', False, False),
+    ('floor', 'assets/base.png', False, False),
+    ('greeting', 'assets/message.png', True, False)] + \
+    [(f'bird{i}', path, True, False) for i, path in enumerate(BIRD_ASSETS)] + \
+    [(f'pipe{i}', path, False, False) for i, path in enumerate(PIPE_ASSETS)] + \
+    [(f'pipe{i}_upper', path, False, True) for i, path in enumerate(PIPE_ASSETS)]   # flipped at load time
+asset_loader = assets.AssetLoader(ASSET_WORKERS)
+asset_loader.prefetch(['assets/message.png', 'assets/04B_19.TTF'])
+sound_loads = {name: asset_loader.sound(f'sound/sfx_{name}.wav') for name in ('wing', 'point', 'die', 'hit', 'swooshing')}
+asset_loader.prefetch(path for name, path, alpha, flip in sprite_assets)
+
+# the greeting over the sky until the game is ready
+splash_time = None  # seconds from START_TIME to the splash on display
+
+def show_splash():
+    global splash_time
+    splash = pygame.transform.scale2x(asset_loader.image('assets/message.png').convert_alpha())
+    screen.fill(SPLASH_RGB)
+    screen.blit(splash, splash.get_rect(center = (DISPLAY_WIDTH/2, DISPLAY_HEIGHT/2)))
+    pygame.display.update()
+    splash_time = time.perf_counter() - START_TIME
+
+show_splash()
+
 # [demo] working with text is:
 # set font -> render text -> create a surface -> put on screen
-game_font = pygame.font.Font('assets/04B_19.TTF', FONT_SIZE)
+game_font = asset_loader.font('assets/04B_19.TTF', FONT_SIZE)
+# the scores only use digits and a label, so we render those once and compose the text from them
+glyph_font = text.GlyphFont(game_font, FONT_ANTIALIAS, COLOR_RGB)
+score_text = text.NumberText(glyph_font, (SCORE_X, SCORE_Y))
+highscore_text = text.NumberText(glyph_font, (SCORE_X, HIGHSCORE_Y), 'High Score: ')
 
 
 
@@ -205,137 +220,247 @@ game_font = pygame.font.Font('assets/04B_19.TTF', FONT_SIZE)
 # [demo] for better collision control, we will use rect to engulf the graphics in geometric shapes
 # [demo] drawing on a screen goes as follows:
 # import an asset as surface -> scale/transform -> overlay with rect if needed -> put/blip on screen
+#
+# the loaded, scaled and converted surfaces are kept in a cache file (see assets.py),
+# from the second launch on they are read back instead of made again
+asset_cache = assets.AssetCache(ASSET_CACHE, loader=asset_loader)
 
-# background image and the floor as a surfaces. we double the size for the given screen
-bg_surface = pygame.transform.scale2x(pygame.image.load('assets/background-day.png').convert())
-floor_surface = pygame.transform.scale2x(pygame.image.load('assets/base.png').convert())
+# all the sprites are packed in a texture atlas (see atlas.py) and drawn as areas of its pages.
+# we double the size for the given screen
+sprite_atlas = asset_cache.atlas(sprite_assets)
+
+# background image and the floor
 floor_x = 0
+floor_layer = layers.ScrollLayer(sprite_atlas.sprite('floor'), FLOOR_HEIGHT)
+sky_rect = pygame.Rect(0, 0, DISPLAY_WIDTH, FLOOR_HEIGHT)   # above the floor, where the background shows
 
 # the bird surface
-# we will use timer-based flapping animation with different surfaces
-bird_flaps = [pygame.transform.scale2x(pygame.image.load('assets/bluebird-downflap.png').convert_alpha()),
-              pygame.transform.scale2x(pygame.image.load('assets/bluebird-midflap.png').convert_alpha()),
-              pygame.transform.scale2x(pygame.image.load('assets/bluebird-upflap.png').convert_alpha())]
+# we will use tick-based flapping animation with different surfaces
+bird_flaps = [sprite_atlas.subsurface(f'bird{i}') for i in range(len(BIRD_ASSETS))]
 bird_flap_index = 0
 bird_surface =  bird_flaps[bird_flap_index]
 bird_rect = bird_surface.get_rect(center = (BIRD_START_X, BIRD_START_Y))  # this will draw a rectangle around the bird surface
-pygame.time.set_timer(BIRD_FLAP_EVT, BIRD_FLAP_FREQ)
-
-# the pipes surface
-# we will use a list of pipe rects to be populated and drawn at a defined frequency
-# [wip] fix all pipes in the list changing colors at once
-pipe_surfaces = [pygame.transform.scale2x(pygame.image.load('assets/pipe-red.png').convert()),
-                pygame.transform.scale2x(pygame.image.load('assets/pipe-green.png').convert())]
-pipe_rect_list = []
-pygame.time.set_timer(SPAWNPIPE_EVT, PIPE_FREQ) # here we define a timer within the game engine
-
-# greeting/game over surface
-greeting_surface = pygame.transform.scale2x(pygame.image.load('assets/message.png').convert_alpha())
-greeting_rect = greeting_surface.get_rect(center = (DISPLAY_WIDTH/2, DISPLAY_HEIGHT/2))
-
-flap_sound = pygame.mixer.Sound('sound/sfx_wing.wav')
-game_score_sound = pygame.mixer.Sound('sound/sfx_point.wav')
-die_sound = pygame.mixer.Sound('sound/sfx_die.wav')
-collision_sound = pygame.mixer.Sound('sound/sfx_hit.wav')
-swooshing_sound = pygame.mixer.Sound('sound/sfx_swooshing.wav')
+bird_rotations = sprites.RotationCache(bird_flaps, BIRD_ANGLE_RESOLUTION)  # every flap surface at every angle
+if PIXEL_COLLISIONS:
+    game.hitbox = collision.MaskHitbox(bird_rotations)  # the rotated sprite is the hitbox, not its rect
+
+# the pipes
+# the engine spawns pipes every PIPE_SPACING pixels of scroll, each pipe picks its texture from this list of (upper, bottom) atlas names
+pipe_textures = [(f'pipe{i}_upper', f'pipe{i}') for i in range(len(PIPE_ASSETS))]
+
+# greeting/game over
+greeting_rect = sprite_atlas.get_rect('greeting', center = (DISPLAY_WIDTH/2, DISPLAY_HEIGHT/2))
+
+asset_cache.save()  # if anything was baked this time
+
+# repaint only what moved each frame, or everything (see DIRTY_RENDERING)
+bg_page, bg_area = sprite_atlas.sprite('background')
+# the floor layer covers the rest, so the background is never painted under it
+renderer = dirty.DirtyRenderer(screen, bg_page, DIRTY_RENDERING, bg_area, sky_rect)
+
+# where each frame goes (see PROFILE)
+frame_profiler = profiler.FrameProfiler(PROFILE)
+
+# frames are paced by sleeps, at a quality level that adapts to the frame cost (see pacing.py)
+def set_quality(preset):
+    global frame_pacer
+    frame_pacer = pacing.FramePacer(preset)
+    frame_pacer.on_change = lambda quality: renderer.invalidate()   # the static floor comes and goes
+
+set_quality(QUALITY)
+
+flap_sound = sound_loads['wing'].result()
+game_score_sound = sound_loads['point'].result()
+die_sound = sound_loads['die'].result()
+collision_sound = sound_loads['hit'].result()
+swooshing_sound = sound_loads['swooshing'].result()
+asset_loader.shutdown()     # all loaded
 
 def action():
-    global bird_speed
-    global game_active
-    if game_active:
-        bird_speed = 0   # halt gravity effect upon a flap
-        bird_speed -= BIRD_FLAP_POWER
+    global prev_bird_y
+    if engine.flap(game):
         flap_sound.play()
+        if recorder:
+            recorder.flap(game)
     else:
-        reset_game()
+        prev_bird_y = game.bird_y   # a new game, nothing to interpolate from
+        if recorder:
+            recorder.start(game)
 
-async def main():
-    # [wip] make a game class and move vars there
-    global game_active
-    global pipe_rect_list
-    global floor_x
-    global bird_speed
-    global game_score
-    global gravity
-    global bird_rect
+############
+# a frame of the game, in three parts: input, physics, drawing.
+# main() runs them in real time, bench.py drives them headless
+#
+fixed_step = timestep.FixedTimestep(FPS, MAX_CATCHUP_STEPS)
+startup_time = None # seconds from START_TIME to the first game frame on display
+show_startup = False
+shown_active = None # the game mode on screen
+
+# fast-forward: for automated play nobody watches in real time. no frame cap,
+# a single physics step a frame and drawing only every render_every frames (0: never).
+# the pipes and the animation go by the game ticks, so the game plays the same
+fast_forward = False
+render_every = 1
+# a bot playing the game (see bots.py): called every physics step, returns True to flap
+controller = None
+
+def set_fast_forward(enabled=True, every=1):
+    global fast_forward
+    global render_every
+    fast_forward = enabled
+    render_every = every
+
+def toggle_profiler():
+    frame_profiler.toggle_overlay()
+    renderer.invalidate()
+
+# the input goes through dispatch tables (see events.py): event type -> handler, key -> action.
+# the keys come from KEY_BINDINGS and can be rebound (event_dispatcher.rebind('flap', ['up']))
+# only these event types are queued, the rest (mouse motion...) are dropped by SDL
+event_dispatcher = events.EventDispatcher(KEY_BINDINGS)
+event_dispatcher.on_action('flap', action)
+event_dispatcher.on_action('quit', exit_app)
+event_dispatcher.on_action('profiler', toggle_profiler)
+event_dispatcher.on_event(pygame.QUIT, lambda event: exit_app())
+event_dispatcher.on_event(pygame.MOUSEBUTTONDOWN, lambda event: action())  # a click or a tap flaps too
+# an uncovered or restored window lost what the dirty frames don't draw again (no compositor keeps it), repaint all
+for window_event in (pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.VIDEOEXPOSE):
+    event_dispatcher.on_event(window_event, lambda event: renderer.invalidate())
+
+# watch for events throughout the main loop
+def handle_events():
+    event_dispatcher.dispatch()
+
+# advance the game in fixed steps, as many as the elapsed time calls for.
+# the game speed stays the same whatever the frame rate
+# returns whether the game was running at the start of the frame (that is what gets drawn)
+def update(elapsed):
+    global render_alpha
+    was_active = game.active
+    for _ in range(fixed_step.advance(elapsed)):
+        if controller and controller(game):
+            action()
+        simulate()
+    render_alpha = fixed_step.alpha
+    return was_active
+
+def set_startup_time():
+    global startup_time
+    startup_time = time.perf_counter() - START_TIME
+    frame_profiler.startup = startup_time
+    if show_startup:
+        print(f'startup: {startup_time*1000:.1f} ms to the first frame, splash at {splash_time*1000:.1f} ms, '
+              f'{asset_cache.report()}\n{asset_loader.report()}', flush=True)
+
+# placing assets and redrawing the canvas
+def render(was_active):
+    global shown_active
+
+    # place background: on a full redraw it is painted whole, otherwise
+    # the renderer only restores it under the sprites of the last frame
+    # switching the game mode shows/hides the static sprites, so repaint all
+    if was_active != shown_active:
+        shown_active = was_active
+        renderer.invalidate()
+    if frame_profiler.overlay:  # drawn over everything, so repaint it all while it shows
+        renderer.invalidate()
+    renderer.begin()
+    frame_profiler.mark('background')
+
+    # the game  will have two modes: .... [wip]
+    # elements in an active game
+    if (was_active):
+        static_floor = not frame_pacer.quality.floor_scroll
+        if static_floor:    # the floor is not drawn again this frame, keep the sprites off it
+            screen.set_clip(sky_rect)
+        # placing the bird
+        bird_animation()
+        bird_rotated = rotate_bird()    # bird rotation animation
+        frame_profiler.mark('rotate_bird')
+        renderer.add(draw_bird(bird_rotated)) # finally, draw the moving, rotated bird
+        frame_profiler.mark('draw_bird')
+
+        # placing the pipes
+        renderer.add_all(draw_pipes(game.pipes))
+        frame_profiler.mark('draw_pipes')
+        if static_floor:
+            screen.set_clip(None)
+    else:
+        update_highscore()
+        if renderer.full:   # static while the game is halted
+            draw_highscore()    # inactive game screen will show the high score
+            sprite_atlas.blit(screen, 'greeting', greeting_rect)
+        frame_profiler.mark('greeting')
+
+    renderer.add(draw_score())
+    frame_profiler.mark('text')
+
+    # placing the floor (it comes after the pipes so it will be drawn above)
+    # it is opaque: updated on the display, nothing to restore under it next frame
+    # [debug] print ("floor_x: " + str(floor_x))
+    for rect in draw_floor():
+        renderer.add_covered(rect)
+    frame_profiler.mark('floor')
+
+    if frame_profiler.overlay:
+        renderer.add_all(frame_profiler.draw_overlay(screen))
+        frame_profiler.mark('overlay')
+
+    renderer.end()
+    frame_profiler.mark('display_update')
+    if startup_time is None:
+        set_startup_time()
+
+# frames: quit after that many frames (None: play on)
+async def main(frames=None):
+    elapsed = 1 / FPS   # time since the last frame (seconds)
+    frame = 0
 
     ############
     # main game loop
     #
     # [wip] change to: while not game_end
-    while True:
-
-        ############
-        # watch for events throughout the main loop
-        #
-        for event in pygame.event.get():    # we can capture any event (mouse movement, times, buttons)
-            if event.type == pygame.QUIT:
-                exit_app()
-            if event.type == pygame.KEYDOWN:    # map key press handlers
-                if event.key == pygame.K_SPACE:
-                    action()
-                if event.key == pygame.K_ESCAPE:    # escape key
-                    exit_app()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                action()
-            if event.type == SPAWNPIPE_EVT:  # handle custom events
-                pipe_rect_list.extend(create_pipe())  # add generated pipes tuple to the list
-            if event.type == BIRD_FLAP_EVT:
-                bird_surface, bird_rect = bird_animation()
-
-        ############
-        # placing assets
-        # [wip] export all to sub functions?
-        #
-
-        # place background: this will be static and not redrawn in the game loop
-        screen.blit(bg_surface, (0,0))  # [demo] origin of the surfaces is the top left, rectangle geometry will place the surface
-
-
-        # the game  will have two modes: .... [wip]
-        # elements in an active game
-        if (game_active):
-            # placing the bird
-            bird_speed += gravity    # move the bird, maintain falling acceleration
-            bird_rect.centery += bird_speed
-            bird_rotated = rotate_bird(bird_surface)    # bird rotation animation
-            draw_bird(bird_rotated) # finally, draw the moving, rotated bird
-
-            game_active = check_collisions(pipe_rect_list)
-
-            # placing the pipes
-            # [wip] parametrize this list properly
-            pipe_rect_list = move_pipes(pipe_rect_list)
-            draw_pipes(pipe_rect_list)
-
-            # placing the score
-            game_score +=1  # [wip] option: count score as pipes passed, add the sound [here] ...
-            #game_score_sound.play()
+    while frames is None or frame < frames:
+        frame += 1
+        frame_profiler.begin_frame()
+        handle_events()
+        frame_profiler.mark('events')
+        if fast_forward:
+            was_active = update(1 / FPS)    # exactly one step, whatever the time
+            frame_profiler.mark('physics')
+            if render_every and frame % render_every == 0:
+                render(was_active)
         else:
-            update_highscore()
-            draw_highscore()    # inactive game screen will show the high score
-            screen.blit(greeting_surface, greeting_rect)
-
-        draw_score()
-
-        # placing the floor (it comes after the pipes so it will be drawn above)
-        # the floor will be moving regardless the game state
-        # [wip] move to function?
-        floor_x -= FLOOR_SPEED
-        # reset moving floor
-        if (floor_x <= -DISPLAY_WIDTH):
-            floor_x = 0
-        # [debug] print ("floor_x: " + str(floor_x))
-        draw_floor()
-
-
-        ############
-        # redraw the canvas
-        #
-        pygame.display.update()
-        # set frame rate. some complex games may require frame limiting
-        clock.tick(FPS)
-        await asyncio.sleep(0)
-
-asyncio.run(main())
+            was_active = update(elapsed)
+            frame_profiler.mark('physics')
+            render(was_active)
+
+            # set frame rate: sleep until the next frame is due, the browser gets its event loop back meanwhile.
+            # the render rate may differ from the physics rate (FPS), and drops when frames run late
+            elapsed = await frame_pacer.wait()
+            frame_profiler.mark('pacing')
+        if fast_forward:
+            await asyncio.sleep(0)
+            frame_profiler.mark('yield')
+        frame_profiler.end_frame()
+    exit_app()
+
+# importing this module (bench.py) sets up the game without running it
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='flappy bird clone')
+    parser.add_argument('--fast-forward', action='store_true', help='no frame cap, one physics step a frame')
+    parser.add_argument('--render-every', type=int, default=1, metavar='N', help='with --fast-forward, draw every N frames (0: never)')
+    parser.add_argument('--autopilot', action='store_true', help='let a bot play (bots.autopilot)')
+    parser.add_argument('--frames', type=int, metavar='N', help='quit after N frames')
+    parser.add_argument('--startup', action='store_true', help='print the time to the first frame')
+    parser.add_argument('--quality', choices=list(QUALITY_PRESETS), default=QUALITY, help='quality preset (see settings.py)')
+    args, _ = parser.parse_known_args()     # the browser build may pass its own
+
+    set_fast_forward(args.fast_forward, args.render_every)
+    set_quality(args.quality)
+    show_startup = args.startup
+    if args.autopilot:
+        controller = bots.autopilot
+    asyncio.run(main(args.frames))
 # pygame.quit()
\ No newline at end of file
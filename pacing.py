@@ -0,0 +1,117 @@
+'''
+    @author [mst]
+    @file   pacing.py
+    @brief  adaptive frame pacing and quality presets
+    the frames are paced by deadlines: each frame has its slot of 1/render_fps,
+    and the time left in it is slept with asyncio.sleep. in the browser (pygbag)
+    that hands the tab back to the event loop until the next frame, instead of
+    spinning in clock.tick(). an oversleep is taken from the next frame wait,
+    so the rate stays right on coarse timers too.
+
+    the pacer measures what each frame costs (the time between two waits, all
+    but the sleep). when the slow frames of a window overrun the frame time,
+    it steps down a level: half the frame rate, down to 30 fps, then the floor
+    scrolling is turned off. when the slow frames get cheap enough for the
+    level above, for a while, it steps back up to the preset it started from.
+    the physics has a fixed timestep, so the game plays the same at any level.
+    the bird tilts at every level: its rotations are looked up, not made, and
+    the tilted sprite is also the pixel hitbox
+
+    usage:
+        pacer = FramePacer('high')      # a name of QUALITY_PRESETS
+        pacer.on_change = ...           # called with the new level
+        while True:
+            ...                         # a frame, drawn as pacer.quality says
+            elapsed = await pacer.wait()
+
+    log:
+    -2023.03 the bird rotation is no quality effect
+    -2023.03 init
+'''
+
+import asyncio
+import time
+from settings import *
+
+
+class Quality:
+    '''what a frame draws, and how often'''
+
+    def __init__(self, render_fps, floor_scroll=True):
+        self.render_fps = render_fps
+        self.floor_scroll = floor_scroll
+
+    # the next level down, None at the bottom
+    def lower(self):
+        if self.render_fps > MIN_RENDER_FPS:
+            return Quality(max(MIN_RENDER_FPS, self.render_fps // 2), self.floor_scroll)
+        if self.floor_scroll:
+            return Quality(self.render_fps, False)
+        return None
+
+    def __str__(self):
+        return f'{self.render_fps} fps, ' + ('floor scroll' if self.floor_scroll else 'static floor')
+
+
+class FramePacer:
+    '''sleeps to the next frame deadline and adapts the quality to the frame cost'''
+
+    def __init__(self, preset=QUALITY):
+        settings = QUALITY_PRESETS[preset]
+        self.preset = preset
+        self.adaptive = settings['adaptive']
+        # the levels, from the preset down
+        self.levels = [Quality(settings['render_fps'], settings['floor_scroll'])]
+        while self.adaptive and self.levels[-1].lower():
+            self.levels.append(self.levels[-1].lower())
+        self.level = 0
+        self.on_change = None   # function(quality), when the level changes
+        self.costs = []         # frame costs of the current window (seconds)
+        self.good_windows = 0   # windows in a row cheap enough for the level above
+        self.changes = 0
+        self.last = self.frame_start = self.deadline = time.perf_counter()
+
+    @property
+    def quality(self):
+        return self.levels[self.level]
+
+    # end of a frame: sleep until the next one is due. returns the seconds since the last wait returned
+    async def wait(self):
+        now = time.perf_counter()
+        if self.adaptive:
+            self._measure(now - self.frame_start)
+        frame_time = 1 / self.quality.render_fps
+        self.deadline += frame_time
+        if self.deadline < now - frame_time:
+            self.deadline = now     # far behind (a hitch, a background tab): no burst of frames to catch up
+        await asyncio.sleep(max(0, self.deadline - now))
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.last = self.frame_start = now
+        return elapsed
+
+    def _measure(self, cost):
+        self.costs.append(cost)
+        if len(self.costs) < PACING_WINDOW:
+            return
+        self.costs.sort()
+        slow = self.costs[len(self.costs) * 9 // 10]   # p90
+        self.costs.clear()
+        if slow > PACING_OVERRUN / self.quality.render_fps and self.level < len(self.levels) - 1:
+            self._set_level(self.level + 1)
+        elif self.level > 0 and slow < PACING_RECOVER / self.levels[self.level - 1].render_fps:
+            self.good_windows += 1
+            if self.good_windows >= PACING_RECOVER_WINDOWS:
+                self._set_level(self.level - 1)
+        else:
+            self.good_windows = 0
+
+    def _set_level(self, level):
+        self.level = level
+        self.good_windows = 0
+        self.changes += 1
+        if self.on_change:
+            self.on_change(self.quality)
+
+    def report(self):
+        return f'quality {self.preset}: {self.quality} (level {self.level + 1}/{len(self.levels)}, {self.changes} changes)'
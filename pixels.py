@@ -0,0 +1,182 @@
+'''
+    @author [mst]
+    @file   pixels.py
+    @brief  pixel observations for the environments, no window
+    the game drawn straight at a small resolution on an off-screen surface,
+    from sprites scaled down once at load time (rather than drawing the full
+    576x1024 screen and shrinking it every step). the frame is read through a
+    pygame.surfarray.pixels* view of that surface, without copying it, into a
+    preallocated ring buffer of the last K frames.
+
+    the ring holds every frame twice, at i and i + K, so the last K frames in
+    order are always a plain slice of it: the stack is a view too, and pushing
+    a frame costs two small copies whatever K is. the returned stack is only
+    valid until the next step, copy it to keep it
+
+    grayscale: the sprites are turned gray when loaded, so the surface has
+    R = G = B and the red channel view (pixels_red) is the gray frame.
+    the score text and the floor scrolling are not drawn, they don't matter to an agent
+
+    usage:
+        env = PixelEnv(size=(72, 128), grayscale=True, stack=4, frame_skip=4)
+        obs = env.reset(seed=1)         # (4, 128, 72) uint8, oldest frame first
+        obs, reward, done, info = env.step(action)
+
+    log:
+    -2023.03 init
+'''
+
+import numpy as np
+import pygame           # main game lib, only surfaces and transforms: no display
+from settings import *
+import engine           # headless game mechanics
+import sprites          # the rotation cache
+import env              # the game environment
+
+PIXEL_SIZE = (DISPLAY_WIDTH // 8, DISPLAY_HEIGHT // 8)  # default observation (width, height)
+GRAY_WEIGHTS = (0.299, 0.587, 0.114)
+
+
+# the sprite as 32-bit rgba: smoothscale takes no palettes, and the colorkey
+# becomes transparency, so the scaled edges blend with it (not with the key color).
+# (convert_alpha would do, but it needs a display)
+def to_rgba(surface):
+    return pygame.image.fromstring(pygame.image.tostring(surface, 'RGBA'), surface.get_size(), 'RGBA')
+
+# R = G = B = the luminance, alpha kept
+def to_gray(surface):
+    surface = surface.copy()
+    rgb = pygame.surfarray.pixels3d(surface)
+    gray = (rgb @ np.array(GRAY_WEIGHTS)).round().astype(np.uint8)
+    rgb[...] = gray[..., None]
+    del rgb     # unlocks the surface
+    return surface
+
+
+class PixelRenderer:
+    '''draws a game state at a reduced resolution, off-screen'''
+
+    def __init__(self, size=PIXEL_SIZE, grayscale=False):
+        self.size = size
+        self.grayscale = grayscale
+        self.scale_x = size[0] / DISPLAY_WIDTH
+        self.scale_y = size[1] / DISPLAY_HEIGHT
+        self.surface = pygame.Surface(size, 0, 32)
+
+        self.background = self._load('assets/background-day.png', (DISPLAY_WIDTH, DISPLAY_HEIGHT))
+        self.floor = self._load('assets/base.png', (DISPLAY_WIDTH, DISPLAY_HEIGHT - FLOOR_HEIGHT))
+        self.floor_top = round(FLOOR_HEIGHT * self.scale_y)
+        self.pipes = []     # (upper, bottom) per texture
+        for path in PIPE_ASSETS:
+            bottom = self._load(path, (PIPE_WIDTH, PIPE_LENGTH))
+            self.pipes.append((pygame.transform.flip(bottom, False, True), bottom))
+        frames = [self._load(path, (BIRD_WIDTH, BIRD_HEIGHT)) for path in BIRD_ASSETS]
+        self.bird_rotations = sprites.RotationCache(frames, BIRD_ANGLE_RESOLUTION)
+
+    # a png as a sprite of the given display size, scaled to the observation
+    def _load(self, path, display_size):
+        surface = to_rgba(pygame.image.load(path))
+        if self.grayscale:
+            surface = to_gray(surface)
+        size = (max(1, round(display_size[0] * self.scale_x)), max(1, round(display_size[1] * self.scale_y)))
+        return pygame.transform.smoothscale(surface, size)
+
+    def draw(self, state):
+        surface = self.surface
+        scale_x = self.scale_x
+        scale_y = self.scale_y
+        surface.blit(self.background, (0, 0))
+        blits = []
+        for pipe in state.pipes:
+            upper, bottom = self.pipes[pipe.texture]
+            left = round((pipe.x - PIPE_WIDTH//2) * scale_x)
+            blits.append((upper, (left, round((pipe.height - PIPE_MARGIN - PIPE_LENGTH) * scale_y))))
+            blits.append((bottom, (left, round(pipe.height * scale_y))))
+        surface.blits(blits, doreturn=False)
+        if state.active:    # as the game shows it: no bird on the game over screen
+            bird = self.bird_rotations.get(state.flap_frame, -state.bird_speed * BIRD_ROTATION_COEFF)
+            surface.blit(bird, (round((BIRD_START_X - BIRD_WIDTH//2) * scale_x),
+                                round((state.bird_y - BIRD_HEIGHT//2) * scale_y)))
+        surface.blit(self.floor, (0, self.floor_top))
+
+    # a view of the drawn frame, (height, width) gray or (height, width, 3) rgb.
+    # it locks the surface: drop it before the next draw
+    def view(self):
+        if self.grayscale:
+            return pygame.surfarray.pixels_red(self.surface).T
+        return pygame.surfarray.pixels3d(self.surface).transpose(1, 0, 2)
+
+
+class FrameStack:
+    '''the last K frames in a preallocated ring, readable as one ordered view'''
+
+    def __init__(self, k, shape, dtype=np.uint8):
+        self.k = k
+        self.ring = np.zeros((2 * k,) + tuple(shape), dtype=dtype)
+        self.next = 0   # slot of the next frame
+
+    # fill the whole stack with a frame (a new game)
+    def reset(self, frame):
+        self.ring[:] = frame
+        self.next = 0
+
+    def push(self, frame):
+        self.ring[self.next] = frame
+        self.ring[self.next + self.k] = frame
+        self.next = (self.next + 1) % self.k
+
+    # (K, ...) the oldest frame first. a view into the ring
+    def frames(self):
+        return self.ring[self.next:self.next + self.k]
+
+
+class PixelEnv(env.Env):
+    '''env.Env with the drawn frames as the observation
+
+    size:      (width, height) of the frames
+    grayscale: one channel instead of rgb
+    stack:     the last frames returned at once, (stack, height, width[, 3])
+    '''
+
+    def __init__(self, size=PIXEL_SIZE, grayscale=False, stack=4, frame_skip=1, hitbox=None):
+        super().__init__(frame_skip, hitbox)
+        self.renderer = PixelRenderer(size, grayscale)
+        shape = (size[1], size[0]) if grayscale else (size[1], size[0], 3)
+        self.frame_stack = FrameStack(stack, shape)
+
+    def reset(self, seed=None):
+        engine.reset_game(self.state, seed)
+        self.renderer.draw(self.state)
+        view = self.renderer.view()
+        self.frame_stack.reset(view)
+        del view
+        return self.frame_stack.frames()
+
+    def observe(self):
+        self.renderer.draw(self.state)
+        view = self.renderer.view()
+        self.frame_stack.push(view)
+        del view
+        return self.frame_stack.frames()
+
+    # the compact observation of env.Env, for a policy that wants both
+    def vector(self):
+        return super().observe()
+
+
+# [demo] measure the speed: python pixels.py
+if __name__ == '__main__':
+    import time
+    for grayscale in (False, True):
+        pixel_env = PixelEnv(grayscale=grayscale, stack=4, frame_skip=4)
+        obs = pixel_env.reset(seed=0)
+        steps = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < 2:
+            vector = pixel_env.vector()
+            obs, reward, done, info = pixel_env.step(vector[1] > 0 and vector[0] > vector[3] + PIPE_MARGIN/2 - 60)
+            steps += 1
+            if done:
+                obs = pixel_env.reset()
+        elapsed = time.perf_counter() - start
+        print(f'{"gray" if grayscale else "rgb "} {obs.shape}: {steps / elapsed:,.0f} steps/sec')
@@ -0,0 +1,110 @@
+'''
+    @author [mst]
+    @file   profiler.py
+    @brief  per-stage frame timing
+    the main loop marks the end of each of its stages (events, physics, drawing,
+    display update, ...), the time between two marks goes to that stage. keeps
+    the last frames of each stage for rolling percentiles, shows them in an
+    overlay and dumps them as json at exit. disabled, a mark is a single check
+
+    usage, in the game loop:
+        profiler.begin_frame()
+        ...                             # handle the events
+        profiler.mark('events')
+        ...                             # physics
+        profiler.mark('physics')
+        profiler.end_frame()
+
+    log:
+    -2023.03 init
+'''
+
+import json
+import time
+from collections import deque
+import pygame           # main game lib
+from settings import *
+
+PERCENTILES = (50, 95, 99)
+
+
+class FrameProfiler:
+    '''named timing sections with rolling percentiles'''
+
+    def __init__(self, enabled=False, window=PROFILE_WINDOW):
+        self.enabled = enabled
+        self.window = window    # frames kept per section
+        self.sections = {}      # name -> deque of durations (seconds), in first mark order
+        self.frame_start = 0
+        self.last = 0
+        self.startup = None     # seconds to the first frame, set by the game
+        # overlay
+        self.overlay = False
+        self.overlay_font = None
+        self.overlay_lines = []
+        self.overlay_frames = 0
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        if self.overlay and not self.enabled:
+            self.enabled = True
+            self.frame_start = self.last = time.perf_counter()  # the frame in progress
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.frame_start = self.last = time.perf_counter()
+
+    # the time since the previous mark (or the frame start) goes to section name
+    def mark(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._add(name, now - self.last)
+        self.last = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self._add('frame', time.perf_counter() - self.frame_start)
+
+    def _add(self, name, duration):
+        samples = self.sections.get(name)
+        if samples is None:
+            samples = self.sections[name] = deque(maxlen=self.window)
+        samples.append(duration)
+
+    # {name: {'count', 'mean', 'p50', 'p95', 'p99'}}, times in ms
+    def stats(self):
+        result = {}
+        for name, samples in self.sections.items():
+            ordered = sorted(samples)
+            count = len(ordered)
+            section = {'count': count, 'mean': sum(ordered) / count * 1000}
+            for p in PERCENTILES:
+                section[f'p{p}'] = ordered[min(count - 1, count * p // 100)] * 1000
+            result[name] = section
+        return result
+
+    def dump(self, path=PROFILE_DUMP):
+        if not self.sections:
+            return
+        startup = self.startup * 1000 if self.startup is not None else None
+        with open(path, 'w') as file:
+            json.dump({'fps': FPS, 'render_fps': RENDER_FPS, 'window': self.window, 'startup_ms': startup,
+                       'sections': self.stats()}, file, indent=2)
+
+    # draw the percentiles table. the text is refreshed twice a second, not every frame
+    def draw_overlay(self, screen):
+        if not self.overlay:
+            return []
+        if self.overlay_font is None:
+            self.overlay_font = pygame.font.SysFont('monospace', 18)
+        if self.overlay_frames % (RENDER_FPS // 2 or 1) == 0:
+            lines = [f'{"ms":<14}{"p50":>7}{"p95":>7}{"p99":>7}']
+            for name, section in self.stats().items():
+                lines.append(f'{name:<14}' + ''.join(f'{section[f"p{p}"]:>7.2f}' for p in PERCENTILES))
+            self.overlay_lines = [self.overlay_font.render(line, True, COLOR_RGB, (0,0,0)) for line in lines]
+        self.overlay_frames += 1
+        line_height = self.overlay_font.get_linesize()
+        return [screen.blit(line, (4, 4 + i * line_height)) for i, line in enumerate(self.overlay_lines)]
@@ -0,0 +1,147 @@
+'''
+    @author [mst]
+    @file   replay.py
+    @brief  compact game replays and headless playback
+    a game is fully defined by its seed (the random pipes) and the ticks at which
+    the bird flapped, so that is all a replay keeps. playback re-simulates the
+    game with the engine, without a window and as fast as it goes. good for
+    regression benchmarks and for verifying a score
+
+    file format (little endian):
+        magic       4s  b'FLRP'
+        version     B
+        flags       B   bit 0: pixel collisions
+        seed        I
+        score       I   the score the game ended with
+        flaps       I   number of flaps
+        then per flap, the ticks since the previous flap as an unsigned LEB128 varint
+        (the only in-game action is a flap, restarting is the start of a replay)
+
+    usage:
+        python replay.py replays/*.rpl   # play back and verify the scores
+
+    log:
+    -2023.03 init
+'''
+
+import os
+import struct
+import time
+import engine           # headless game mechanics
+from settings import *
+
+MAGIC = b'FLRP'
+VERSION = 1
+FLAG_PIXEL_COLLISIONS = 1
+HEADER = struct.Struct('<4sBBIII')
+
+
+class Replay:
+    '''a recorded game: its seed and the ticks of its flaps'''
+
+    def __init__(self, seed, flaps=None, score=0, pixel_collisions=False):
+        self.seed = seed
+        self.flaps = flaps if flaps is not None else []   # ticks, ascending
+        self.score = score
+        self.pixel_collisions = pixel_collisions
+
+    def encode(self):
+        flags = FLAG_PIXEL_COLLISIONS if self.pixel_collisions else 0
+        data = bytearray(HEADER.pack(MAGIC, VERSION, flags, self.seed, self.score, len(self.flaps)))
+        last = 0
+        for tick in self.flaps:
+            delta = tick - last
+            last = tick
+            while delta >= 0x80:
+                data.append((delta & 0x7f) | 0x80)
+                delta >>= 7
+            data.append(delta)
+        return bytes(data)
+
+    @classmethod
+    def decode(cls, data):
+        magic, version, flags, seed, score, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not a replay file (or a newer version)')
+        flaps = []
+        tick = 0
+        pos = HEADER.size
+        for _ in range(count):
+            delta = 0
+            shift = 0
+            while True:
+                byte = data[pos]
+                pos += 1
+                delta |= (byte & 0x7f) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            tick += delta
+            flaps.append(tick)
+        return cls(seed, flaps, score, bool(flags & FLAG_PIXEL_COLLISIONS))
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            file.write(self.encode())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            return cls.decode(file.read())
+
+
+class Recorder:
+    '''records the games played on a GameState, one replay a game'''
+
+    def __init__(self, directory=REPLAY_DIR):
+        self.directory = directory
+        self.replay = None
+
+    # call right after the game is reset
+    def start(self, state):
+        self.replay = Replay(state.seed, pixel_collisions=state.hitbox is not None)
+
+    # call on every flap, before the next step
+    def flap(self, state):
+        if self.replay:
+            self.replay.flaps.append(state.tick)
+
+    # call when the game is over. returns the saved file path
+    def finish(self, state):
+        if not self.replay:
+            return None
+        self.replay.score = state.score
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{self.replay.seed:08x}.rpl')
+        self.replay.save(path)
+        self.replay = None
+        return path
+
+
+# re-simulate a replay headlessly. returns the game state at its end
+def play(replay, hitbox=None, max_ticks=None):
+    if replay.pixel_collisions and hitbox is None:
+        import collision    # needs pygame, but not a display
+        hitbox = collision.load_hitbox()
+    state = engine.GameState(hitbox=hitbox)
+    engine.reset_game(state, replay.seed)
+    flaps = replay.flaps
+    next_flap = 0
+    while state.active and (max_ticks is None or state.tick < max_ticks):
+        while next_flap < len(flaps) and flaps[next_flap] == state.tick:
+            engine.flap(state)
+            next_flap += 1
+        engine.step(state)
+    return state
+
+
+if __name__ == '__main__':
+    import sys
+    for path in sys.argv[1:]:
+        replay = Replay.load(path)
+        start = time.perf_counter()
+        state = play(replay)
+        elapsed = time.perf_counter() - start
+        verdict = 'ok' if state.score == replay.score else 'MISMATCH'
+        print(f'{path}: recorded {replay.score}, replayed {state.score} [{verdict}] '
+              f'{state.tick} ticks in {elapsed*1000:.1f} ms ({os.path.getsize(path)} bytes)')
@@ -0,0 +1,91 @@
+'''
+    @author [mst]
+    @file   settings.py
+    @brief  game constants
+    shared by the renderer (main.py) and the headless simulation (engine.py).
+    this module must not import pygame so the simulation can run without a display
+
+    log:
+    -2023.03 split from main.py
+'''
+
+# constants
+# [bp] use caps for const values
+DISPLAY_WIDTH  = 576
+DISPLAY_HEIGHT = 1024
+FPS = 120   # frames per second. the physics is tuned per frame at this rate
+RENDER_FPS = FPS    # drawn frames per second. lower on weak hardware, raise on fast displays
+MAX_CATCHUP_STEPS = 8   # the most physics steps run for a single slow frame
+# quality presets, picked at launch (main.py --quality NAME). render_fps: drawn frames per second,
+# floor_scroll: the floor moves (static, it is only drawn on full frames),
+# adaptive: step down to 60 then 30 fps, then to a static floor, when frames take too long (see pacing.py)
+QUALITY_PRESETS = {
+    'high':   {'render_fps': RENDER_FPS, 'floor_scroll': True, 'adaptive': True},
+    'medium': {'render_fps': 60, 'floor_scroll': True, 'adaptive': True},
+    'low':    {'render_fps': 30, 'floor_scroll': False, 'adaptive': False},
+    'fixed':  {'render_fps': RENDER_FPS, 'floor_scroll': True, 'adaptive': False},
+}
+QUALITY = 'high'
+MIN_RENDER_FPS = 30 # adaptive pacing goes no lower
+PACING_WINDOW = 30  # frames measured before deciding to change the quality
+PACING_OVERRUN = 0.9    # step down when the slow frames (p90) take this much of the frame time
+PACING_RECOVER = 0.5    # step back up when they would take less than this much of the better level frame time
+PACING_RECOVER_WINDOWS = 10 # for that many windows in a row
+FONT_SIZE = 50
+FONT_ANTIALIAS = False
+SOUND_FREQ = 44100
+SOUND_SIZE = -16
+SOUND_CHANNELS = 2
+SOUND_BUFFER = 512
+COLOR_RGB = [255, 255, 255]
+SCORE_X = DISPLAY_WIDTH/2
+SCORE_Y = 100
+HIGHSCORE_Y = 850
+DIRTY_RENDERING = True  # repaint only the regions that changed. set False for a full redraw every frame
+PROFILE = False # time the main loop stages. the overlay (F3) turns it on too
+PROFILE_WINDOW = 600    # frames kept for the percentiles
+PROFILE_DUMP = 'profile.json'   # written at exit when profiling
+ASSET_CACHE = 'assets.cache'    # the baked sprites (see assets.py). empty: bake at every launch
+ASSET_WORKERS = 4   # threads reading and decoding the asset files at startup. 0: load them in turn
+SPLASH_RGB = (78, 192, 202) # the sky around the greeting while the game loads
+LEADERBOARD = 'leaderboard.db'  # the high scores file (see leaderboard.py). None: this session only
+KEY_BINDINGS = {'flap': ['space'], 'quit': ['escape'], 'profiler': ['f3']}  # pygame key names per action (see events.py)
+
+FLOOR_HEIGHT = 900
+FLOOR_SPEED = 1
+GRAVITY_COEFF = 0.25    # gravity acceleration
+BIRD_START_X = 100
+BIRD_START_Y = DISPLAY_HEIGHT/2
+BIRD_START_SPEED = -10
+BIRD_ROTATION_COEFF = 3 # bird surface rotation sensitivity
+BIRD_FLAP_POWER = 7     # how strong is the bird's flap. decrease to make game easier :)
+BIRD_FLAP_FREQ = 300    #flapping animation speed
+BIRD_FLAP_TICKS = BIRD_FLAP_FREQ * FPS // 1000  # the same speed counted in frames
+BIRD_DISPLAY_TOLERANCE = 100
+PIXEL_COLLISIONS = True # collide with the rotated bird pixels instead of its rect (windowed game only)
+FLOCK_DEAD_ALPHA = 80   # opacity of the dead birds of a flock (see flock.py). None: hide them
+BIRD_ANGLE_RESOLUTION = GRAVITY_COEFF * BIRD_ROTATION_COEFF  # rotation cache step (degrees). the speed changes by gravity steps, so this is exact
+PIPE_START_X = DISPLAY_WIDTH + 200
+PIPE_HEIGHTS = [400, 600, 800]  # possible pipes heights variations
+PIPE_MARGIN = 300   # the clearance between the pipes
+PIPE_SPEED = 5
+PIPE_FREQ = 1200    # pipes spawning frequency (in ms)
+PIPE_SPACING = PIPE_SPEED * PIPE_FREQ * FPS / 1000   # world pixels between two pipes, the pipes spawn by this distance
+PIPE_LOOKAHEAD = 4  # pipes of the course drawn ahead (see engine.PipeSchedule)
+PIPE_POOL_SIZE = 8  # the most pipes kept at once. 2 fit the display, the rest is slack for frame drops
+
+# sprite sizes after scale2x. the simulation needs them for the hitboxes
+# [bp] keep in sync with the assets
+BIRD_WIDTH = 68
+BIRD_HEIGHT = 48
+PIPE_WIDTH = 104
+PIPE_LENGTH = 640
+
+# pipe textures. the simulation only picks an index into this list
+PIPE_ASSETS = ['assets/pipe-red.png', 'assets/pipe-green.png']
+# the bird flap animation frames
+BIRD_ASSETS = ['assets/bluebird-downflap.png', 'assets/bluebird-midflap.png', 'assets/bluebird-upflap.png']
+
+# replays (see replay.py)
+RECORD_REPLAYS = False  # save every game played in the window
+REPLAY_DIR = 'replays'
@@ -0,0 +1,87 @@
+'''
+    @author [mst]
+    @file   sprites.py
+    @brief  pre-rendered sprite caches
+    transforms like rotozoom allocate a new surface every call, so whatever
+    can be computed ahead is kept here and the game loop only does lookups
+
+    log:
+    -2023.03 pipe textures cache
+    -2023.03 bird rotation cache
+'''
+
+import math
+import time
+import pygame           # main game lib
+from settings import *
+
+
+# the bird angle is -bird_speed * BIRD_ROTATION_COEFF (see main.rotate_bird).
+# the fastest the bird goes up is its start speed, and the fastest it falls is
+# from the top tolerance line down to the floor
+BIRD_MAX_FALL_SPEED = math.sqrt(2 * GRAVITY_COEFF * (FLOOR_HEIGHT + BIRD_DISPLAY_TOLERANCE)) + GRAVITY_COEFF
+BIRD_ANGLE_MAX = -BIRD_START_SPEED * BIRD_ROTATION_COEFF
+BIRD_ANGLE_MIN = -BIRD_MAX_FALL_SPEED * BIRD_ROTATION_COEFF
+
+
+class RotationCache:
+    '''rotated variants of the bird flap frames, quantized by angle
+
+    frames:     the flap surfaces
+    resolution: the angle step in degrees. coarser steps use less memory
+    lazy:       rotate on first use instead of at startup, keeping at most
+                max_size surfaces (the oldest is dropped first)
+    '''
+
+    def __init__(self, frames, resolution=BIRD_ANGLE_RESOLUTION, lazy=False, max_size=256):
+        self.frames = frames
+        self.resolution = resolution
+        self.lazy = lazy
+        self.max_size = max_size
+        self.step_min = math.floor(BIRD_ANGLE_MIN / resolution)
+        self.step_max = math.ceil(BIRD_ANGLE_MAX / resolution)
+        self.surfaces = {}  # (frame index, angle step) -> rotated surface
+        self.build_time = 0
+
+        if not lazy:
+            start = time.perf_counter()
+            for index in range(len(frames)):
+                for angle_step in range(self.step_min, self.step_max + 1):
+                    self.surfaces[(index, angle_step)] = self._rotate(index, angle_step)
+            self.build_time = time.perf_counter() - start
+
+    def _rotate(self, index, angle_step):
+        return pygame.transform.rotozoom(self.frames[index], angle_step * self.resolution, 1)
+
+    # the cache key of a flap frame at an angle, angles out of range are clamped
+    def key(self, index, angle):
+        return (index, min(max(round(angle / self.resolution), self.step_min), self.step_max))
+
+    # the rotated surface for a flap frame
+    def get(self, index, angle):
+        key = self.key(index, angle)
+        surface = self.surfaces.get(key)
+        if surface is None:   # lazy mode only
+            if len(self.surfaces) >= self.max_size:
+                del self.surfaces[next(iter(self.surfaces))]
+            surface = self.surfaces[key] = self._rotate(*key)
+        return surface
+
+    # pixel memory held by the cache in bytes
+    def memory(self):
+        return sum(s.get_width() * s.get_height() * s.get_bytesize() for s in self.surfaces.values())
+
+    def report(self):
+        return (f'rotation cache: {len(self.surfaces)} surfaces at {self.resolution:g} deg, '
+                f'built in {self.build_time*1000:.1f} ms, {self.memory()/1024:.0f} KiB')
+
+
+# [demo] startup time vs memory for a few resolutions: python sprites.py
+if __name__ == '__main__':
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    pygame.display.set_mode((DISPLAY_WIDTH, DISPLAY_HEIGHT))
+    frames = [pygame.transform.scale2x(pygame.image.load(path).convert_alpha()) for path in BIRD_ASSETS]
+    for resolution in (BIRD_ANGLE_RESOLUTION, 1.5, 3, 6):
+        print(RotationCache(frames, resolution).report())
@@ -0,0 +1,108 @@
+'''
+    @author [mst]
+    @file   text.py
+    @brief  glyph-cached text rendering for the score lines
+    Font.render rasterizes the whole string on every call. the scores only use
+    ten digits and a static label, so we render those once and draw numbers by
+    blitting the cached glyphs. the glyph layout is redone only when the value
+    actually changes
+
+    log:
+    -2023.03 init
+'''
+
+import pygame           # main game lib
+from settings import *
+
+DIGITS = '0123456789'
+
+
+class GlyphFont:
+    '''pre-rendered glyphs (and whole labels) of a font in a single color'''
+
+    def __init__(self, font, antialias=FONT_ANTIALIAS, color=COLOR_RGB, chars=DIGITS):
+        self.font = font
+        self.antialias = antialias
+        self.color = color
+        self.glyphs = {}
+        for char in chars:
+            self.glyph(char)
+        self.height = font.get_height()
+
+    # a cached rendered glyph or label. anything not cached yet is rendered once.
+    # the glyphs are kept in the display format. without antialiasing the text has
+    # no partial alpha, so a run-length encoded colorkey makes them ~4x cheaper to
+    # blit than the Font.render output
+    def glyph(self, text):
+        surface = self.glyphs.get(text)
+        if surface is None:
+            surface = self.font.render(text, self.antialias, self.color)
+            if self.antialias:
+                surface = surface.convert_alpha()
+            else:
+                surface = surface.convert()
+                surface.set_colorkey(surface.get_colorkey(), pygame.RLEACCEL)
+            self.glyphs[text] = surface
+        return surface
+
+    # place a line centered at center: the label as a whole, the digits glyph by glyph.
+    # returns a blits() sequence and the line rect
+    def layout(self, digits, center, label=''):
+        parts = [self.glyph(char) for char in digits]
+        if label:
+            parts.insert(0, self.glyph(label))
+        rect = pygame.Rect(0, 0, sum(part.get_width() for part in parts), self.height)
+        rect.center = center
+        sequence = []
+        x = rect.left
+        for part in parts:
+            sequence.append((part, (x, rect.top)))
+            x += part.get_width()
+        return sequence, rect
+
+
+class NumberText:
+    '''a number line (with an optional label) laid out again only when its value changes'''
+
+    def __init__(self, glyph_font, center, label=''):
+        self.glyph_font = glyph_font
+        self.center = center
+        self.label = label
+        self.value = None
+        self.sequence = None
+        self.rect = None
+
+    def draw(self, screen, value):
+        if value != self.value:
+            self.value = value
+            self.sequence, self.rect = self.glyph_font.layout(str(int(value)), self.center, self.label)
+        screen.blits(self.sequence, False)
+        return self.rect
+
+
+# [demo] compare against a per-frame Font.render: python text.py
+if __name__ == '__main__':
+    import os
+    import time
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    screen = pygame.display.set_mode((DISPLAY_WIDTH, DISPLAY_HEIGHT))
+    game_font = pygame.font.Font('assets/04B_19.TTF', FONT_SIZE)
+    frames = 20000
+
+    # the score goes up every frame while playing, the high score stays put
+    for title, values in (('changing score', range(frames)), ('static high score', [1234] * frames)):
+        start = time.perf_counter()
+        for value in values:
+            surface = game_font.render(f'High Score: {int(value)}', FONT_ANTIALIAS, COLOR_RGB)
+            screen.blit(surface, surface.get_rect(center = (SCORE_X, HIGHSCORE_Y)))
+        font_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        line = NumberText(GlyphFont(game_font), (SCORE_X, HIGHSCORE_Y), 'High Score: ')
+        for value in values:
+            line.draw(screen, value)
+        glyph_time = time.perf_counter() - start
+
+        print(f'{title}: Font.render {font_time/frames*1e6:.1f} us/frame, '
+              f'glyph cache {glyph_time/frames*1e6:.1f} us/frame ({font_time/glyph_time:.1f}x)')
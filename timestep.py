@@ -0,0 +1,51 @@
+'''
+    @author [mst]
+    @file   timestep.py
+    @brief  fixed timestep for the game physics
+    the physics constants are tuned per frame at FPS frames per second. to keep
+    the game speed the same whatever the actual frame rate, the elapsed time is
+    collected in an accumulator and spent in fixed steps of 1/FPS. the renderer
+    interpolates between the last two steps with alpha
+
+    usage, once a rendered frame:
+        for _ in range(timestep.advance(elapsed_seconds)):
+            engine.step(game)
+        draw(..., timestep.alpha)
+
+    log:
+    -2023.03 init
+'''
+
+from settings import *
+
+
+class FixedTimestep:
+    '''turns elapsed wall time into a number of fixed simulation steps'''
+
+    def __init__(self, step_rate=FPS, max_steps=MAX_CATCHUP_STEPS):
+        self.step_time = 1 / step_rate
+        self.max_steps = max_steps  # the most steps a single frame may catch up on
+        self.accumulator = 0
+        self.dropped = 0            # simulation time given up by the catch-up cap (seconds)
+
+    # add the time since the last frame, returns how many steps to run now
+    def advance(self, elapsed):
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.step_time)
+        if steps > self.max_steps:
+            # a very long frame (window dragged, tab in background): rather than
+            # a burst of steps that only makes the next frame longer, skip the time
+            self.dropped += (steps - self.max_steps) * self.step_time
+            steps = self.max_steps
+            self.accumulator = self.step_time * steps
+        self.accumulator -= steps * self.step_time
+        return steps
+
+    # how far the render time is between the last step and the next, 0..1
+    @property
+    def alpha(self):
+        return self.accumulator / self.step_time
+
+# linear interpolation of a value between the previous and the current step
+def lerp(previous, current, alpha):
+    return previous + (current - previous) * alpha